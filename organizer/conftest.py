@@ -0,0 +1,30 @@
+import pytest
+from django.conf import settings
+
+
+def pytest_configure(config):
+    """
+    Adds SQLite database standing in for read replica when settings don't define
+    one, so replica routing is tested locally. Tests run against separate databases
+    without mirroring, so replica behaves like one lagging behind primary.
+    """
+    settings.DATABASES.setdefault(
+        settings.REPLICA_DATABASE,
+        {"ENGINE": "django.db.backends.sqlite3", "NAME": "replica.sqlite3"},
+    )
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """
+    Cached data must not outlive database rolled back after each test.
+    """
+    from django.core.cache import caches
+
+    from timetable.caching import cache_stats
+    from timetable.metrics import request_metrics
+
+    for cache in caches.all():
+        cache.clear()
+    cache_stats.clear()
+    request_metrics.clear()
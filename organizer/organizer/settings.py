@@ -41,7 +41,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'timetable.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'timetable.routers.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -84,6 +86,48 @@ DATABASES = {
     }
 }
 
+# Read replica, used only when its alias is configured in DATABASES, e.g.
+# DATABASES['replica'] = {..., 'TEST': {'MIRROR': 'default'}}
+# Views with `replica_reads = True` read from it; client which wrote
+# is pinned to primary for REPLICA_PIN_SECONDS.
+DATABASE_ROUTERS = ['timetable.routers.PrimaryReplicaRouter']
+REPLICA_DATABASE = 'replica'
+REPLICA_PIN_SECONDS = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+# Use shared backend (e.g. Redis or Memcached) when running more than one worker.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+AVAILABILITY_CACHE_ALIAS = 'default'
+AVAILABILITY_CACHE_TIMEOUT = 60 * 60
+
+# Cache of staff pages, invalidated by model versions rather than by timeout.
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Longest reservation in days, bounds overlap queries of reservation spans.
+MAX_RESERVATION_DAYS = 14
+
+# Reservation table size above which check_query_plans fails on sequential scans.
+QUERY_PLAN_SEQSCAN_THRESHOLD = 10000
+
+
+# Requests slower than this are logged with their SQL, sampled at given rate.
+METRICS_SLOW_REQUEST_SECONDS = 0.5
+METRICS_SLOW_REQUEST_SAMPLE_RATE = 0.1
+
+
+# Baseline of benchmark_routes command and allowed p95 growth over it.
+BENCHMARK_BASELINE = BASE_DIR / 'benchmarks.json'
+BENCHMARK_THRESHOLD = 0.25
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
@@ -130,3 +174,11 @@ STATIC_URL = '/static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'timetable.CustomUser'
+
+AUTHENTICATION_BACKENDS = ['timetable.backends.EmailBackend']
+
+# Login throttling and cache of emails without account.
+LOGIN_CACHE_ALIAS = 'default'
+LOGIN_UNKNOWN_EMAIL_TIMEOUT = 5 * 60
+LOGIN_FAILURE_LIMIT = 10
+LOGIN_FAILURE_WINDOW = 15 * 60
@@ -36,6 +36,8 @@ from timetable.views import (
     AddUserReservationView,
     UserReservationDetailsView,
     AllReservationsView,
+    ReservationCalendarView,
+    ReservationExportView,
     ManageReservationView,
     LoginView,
     LogoutView,
@@ -44,6 +46,16 @@ from timetable.views import (
     DeleteServiceView,
     AllServicesView,
     CheckReservationView,
+    ServiceAvailabilityView,
+    TeamAvailabilityView,
+    TeamClashesView,
+    WorkloadReportView,
+    ScheduleReservationsView,
+    BatchReservationView,
+    CacheStatsView,
+    MetricsView,
+    AddRecurringReservationView,
+    RecurringReservationsView,
 )
 
 urlpatterns = [
@@ -71,12 +83,24 @@ urlpatterns = [
     path('reservation/', AddUserReservationView.as_view(), name="reservation"),
     path('reservation/<int:reservation_id>/', UserReservationDetailsView.as_view(), name="reservation-details"),
     path('all-reservations/', AllReservationsView.as_view(), name="all-reservations"),
+    path('reservation/calendar/', ReservationCalendarView.as_view(), name="reservation-calendar"),
+    path('reservation/export/', ReservationExportView.as_view(), name="reservation-export"),
     path('reservation/manage/<int:pk>/', ManageReservationView.as_view(), name="manage-reservation"),
+    path('reservation/batch/', BatchReservationView.as_view(), name="batch-reservations"),
+    path('reservation/schedule/', ScheduleReservationsView.as_view(), name="schedule-reservations"),
     path('login/', LoginView.as_view(), name="login"),
     path('logout/', LogoutView.as_view(), name="logout"),
     path('user/<int:user_id>/reservations/', AllUserReservationsView.as_view(), name="user-reservations"),
+    path('reservation/recurring/', AddRecurringReservationView.as_view(), name="recurring-reservation"),
+    path('user/<int:user_id>/recurring/', RecurringReservationsView.as_view(), name="recurring-reservations"),
     path('add-service/', AddServiceView.as_view(), name="add-service"),
     path('service/delete/<int:service_id>/', DeleteServiceView.as_view(), name="delete-service"),
     path('all-services/', AllServicesView.as_view(), name="all-services"),
     path('reservation/<str:date>/<int:service>', CheckReservationView.as_view(), name="check-reservation"),
+    path('cache-stats/', CacheStatsView.as_view(), name="cache-stats"),
+    path('metrics/', MetricsView.as_view(), name="metrics"),
+    path('service/<int:service>/availability/', ServiceAvailabilityView.as_view(), name="service-availability"),
+    path('team/<int:team_id>/availability/', TeamAvailabilityView.as_view(), name="team-availability"),
+    path('team-clashes/', TeamClashesView.as_view(), name="team-clashes"),
+    path('workload/', WorkloadReportView.as_view(), name="workload"),
 ]
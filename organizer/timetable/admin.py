@@ -6,6 +6,7 @@ from .models import (CustomUser,
                      Employee,
                      Team,
                      Reservation,
+                     RecurringReservation,
                      Comments,
                      Services)
 
@@ -34,5 +35,6 @@ admin.site.register(CustomUser)
 admin.site.register(Employee)
 admin.site.register(Team)
 admin.site.register(Reservation)
+admin.site.register(RecurringReservation)
 admin.site.register(Comments)
 admin.site.register(Services)
@@ -0,0 +1,204 @@
+import datetime
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+from timetable.models import RecurringReservation, Reservation, date_span
+from timetable.recurrence import Recurrence
+
+
+def as_date(value):
+    """
+    Converts date given as ISO string or datetime to date object.
+    """
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, str):
+        return datetime.date.fromisoformat(value)
+    return value
+
+
+class AvailabilityIndex:
+    """
+    Keeps set of booked dates for every service in cache backend selected by
+    AVAILABILITY_CACHE_ALIAS setting, so checking a date doesn't hit the database.
+    Multi-day reservations add every day of their span to the set.
+    Sets are loaded lazily from database when cache is cold. Saving or deleting
+    reservation moves version of service set forward (see timetable.signals) instead
+    of changing the set in place, so concurrent changes can't overwrite each other
+    and set loaded before a change is never read after it.
+    Sets are always loaded from primary database, as lagging replica would leave
+    recent bookings out of cache.
+    Recurring reservations are kept as rules next to the set, versioned the same
+    way, and dates are tested against them directly, so their occurrences are
+    never materialized.
+    """
+
+    key_prefix = "availability:service"
+    rules_key_prefix = "availability:rules"
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, "AVAILABILITY_CACHE_ALIAS", "default")]
+
+    @property
+    def timeout(self):
+        return getattr(settings, "AVAILABILITY_CACHE_TIMEOUT", 3600)
+
+    def version_key(self, service_id, prefix=None):
+        return f"{prefix or self.key_prefix}:{service_id}:version"
+
+    def key(self, service_id, prefix=None):
+        """
+        Returns key of current set (or rules with `rules_key_prefix`) of service,
+        starting missing version with current time, so version lost with evicted
+        key never repeats.
+        """
+        prefix = prefix or self.key_prefix
+        version_key = self.version_key(service_id, prefix)
+        version = self.cache.get(version_key)
+        if version is None:
+            self.cache.add(version_key, time.time_ns(), timeout=None)
+            version = self.cache.get(version_key)
+        return f"{prefix}:{service_id}:{version}"
+
+    async def akey(self, service_id, prefix=None):
+        prefix = prefix or self.key_prefix
+        version_key = self.version_key(service_id, prefix)
+        version = await self.cache.aget(version_key)
+        if version is None:
+            await self.cache.aadd(version_key, time.time_ns(), timeout=None)
+            version = await self.cache.aget(version_key)
+        return f"{prefix}:{service_id}:{version}"
+
+    def booked_dates(self, service_id):
+        key = self.key(service_id)
+        dates = self.cache.get(key)
+        if dates is None:
+            dates = self.load(service_id, key)
+        return dates
+
+    async def abooked_dates(self, service_id):
+        key = await self.akey(service_id)
+        dates = await self.cache.aget(key)
+        if dates is None:
+            dates = await sync_to_async(self.load)(service_id, key)
+        return dates
+
+    def load(self, service_id, key=None):
+        # Key is taken before reading database, so set missing later changes
+        # is stored under version they have already moved past.
+        key = key or self.key(service_id)
+        dates = frozenset(
+            date
+            for start, finish in Reservation.objects.using(DEFAULT_DB_ALIAS)
+            .filter(service_type_id=service_id)
+            .values_list("target_date", "finish_date")
+            for date in date_span(start, finish)
+        )
+        self.cache.set(key, dates, self.timeout)
+        return dates
+
+    def rules_key(self, service_id):
+        return self.key(service_id, self.rules_key_prefix)
+
+    def rules(self, service_id):
+        key = self.rules_key(service_id)
+        rules = self.cache.get(key)
+        if rules is None:
+            rules = self.load_rules(service_id, key)
+        return rules
+
+    async def arules(self, service_id):
+        key = await self.akey(service_id, self.rules_key_prefix)
+        rules = await self.cache.aget(key)
+        if rules is None:
+            rules = await sync_to_async(self.load_rules)(service_id, key)
+        return rules
+
+    def load_rules(self, service_id, key=None):
+        key = key or self.rules_key(service_id)
+        rules = tuple(
+            Recurrence(*values)
+            for values in RecurringReservation.objects.using(DEFAULT_DB_ALIAS)
+            .filter(service_type_id=service_id)
+            .exclude(finish_date__lt=datetime.date.today())
+            .values_list("start_date", "finish_date", "frequency", "interval")
+        )
+        self.cache.set(key, rules, self.timeout)
+        return rules
+
+    def is_available(self, service_id, date, finish=None):
+        dates, rules = self.booked_dates(service_id), self.rules(service_id)
+        return all(
+            self._is_free(day, dates, rules)
+            for day in date_span(as_date(date), as_date(finish or date))
+        )
+
+    def occupied_between(self, service_id, start, end):
+        return self._occupied(
+            as_date(start),
+            as_date(end),
+            self.booked_dates(service_id),
+            self.rules(service_id),
+        )
+
+    async def ais_available(self, service_id, date, finish=None):
+        dates = await self.abooked_dates(service_id)
+        rules = await self.arules(service_id)
+        return all(
+            self._is_free(day, dates, rules)
+            for day in date_span(as_date(date), as_date(finish or date))
+        )
+
+    async def aoccupied_between(self, service_id, start, end):
+        start, end = as_date(start), as_date(end)
+        return self._occupied(
+            start,
+            end,
+            await self.abooked_dates(service_id),
+            await self.arules(service_id),
+        )
+
+    def _is_free(self, date, dates, rules):
+        return date not in dates and not any(rule.occurs_on(date) for rule in rules)
+
+    def _occupied(self, start, end, dates, rules):
+        occupied = {date for date in dates if start <= date <= end}
+        for rule in rules:
+            occupied.update(rule.occurrences(start, end))
+        return sorted(occupied)
+
+    def rule_conflict(self, service_id, recurrence, fresh=False):
+        """
+        Returns first date on which given rule collides with booked date or with
+        other rule of the service, None when whole rule is free. With `fresh`
+        dates and rules are read from database instead of cache, which may be
+        behind transactions committed moments ago.
+        """
+        if fresh:
+            dates, rules = self.load(service_id), self.load_rules(service_id)
+        else:
+            dates, rules = self.booked_dates(service_id), self.rules(service_id)
+        conflicts = [date for date in dates if recurrence.occurs_on(date)]
+        for rule in rules:
+            date = recurrence.first_common_date(rule)
+            if date is not None:
+                conflicts.append(date)
+        return min(conflicts, default=None)
+
+    def invalidate(self, service_id, prefix=None):
+        version_key = self.version_key(service_id, prefix)
+        try:
+            self.cache.incr(version_key)
+        except ValueError:
+            self.cache.add(version_key, time.time_ns(), timeout=None)
+
+    def invalidate_rules(self, service_id):
+        self.invalidate(service_id, self.rules_key_prefix)
+
+
+availability_index = AvailabilityIndex()
@@ -0,0 +1,88 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+UserModel = get_user_model()
+
+UNKNOWN_EMAIL = "unknown_email"
+INVALID_PASSWORD = "invalid_password"
+THROTTLED = "throttled"
+
+
+def get_cache():
+    return caches[getattr(settings, "LOGIN_CACHE_ALIAS", "default")]
+
+
+def unknown_email_key(email):
+    # Accounts are looked up by exact email, so key must not fold case either,
+    # or miss of "Jan@..." would hide account "jan@...".
+    digest = hashlib.md5(email.encode()).hexdigest()
+    return f"login:unknown:{digest}"
+
+
+def failures_key(request):
+    return f"login:failures:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def forget_unknown_email(email):
+    get_cache().delete(unknown_email_key(email))
+
+
+class EmailBackend(ModelBackend):
+    """
+    Authenticates user by email with single query and sets reason of failure
+    in `request.login_failure`. Emails without account are remembered in cache
+    for LOGIN_UNKNOWN_EMAIL_TIMEOUT (forgotten once such user is saved, see
+    timetable.signals), so repeated attempts don't hit database. Client with
+    LOGIN_FAILURE_LIMIT failures within LOGIN_FAILURE_WINDOW is refused before
+    password is hashed.
+    Unknown emails are not hashed against dummy password as login view
+    already tells they have no account by redirecting to registration.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        email = UserModel.objects.normalize_email(username)
+        cache = get_cache()
+        if request is not None and self.is_throttled(request):
+            return self.fail(request, THROTTLED)
+        if cache.get(unknown_email_key(email)):
+            return self.fail(request, UNKNOWN_EMAIL)
+        try:
+            user = UserModel._default_manager.get_by_natural_key(email)
+        except UserModel.DoesNotExist:
+            timeout = getattr(settings, "LOGIN_UNKNOWN_EMAIL_TIMEOUT", 5 * 60)
+            cache.set(unknown_email_key(email), True, timeout)
+            return self.fail(request, UNKNOWN_EMAIL)
+        if user.check_password(password) and self.user_can_authenticate(user):
+            if request is not None:
+                cache.delete(failures_key(request))
+            return user
+        return self.fail(request, INVALID_PASSWORD)
+
+    def is_throttled(self, request):
+        limit = getattr(settings, "LOGIN_FAILURE_LIMIT", 10)
+        return get_cache().get(failures_key(request), 0) >= limit
+
+    def fail(self, request, reason):
+        if request is not None:
+            request.login_failure = reason
+            if reason != THROTTLED:
+                self.record_failure(request)
+        return None
+
+    def record_failure(self, request):
+        cache = get_cache()
+        key = failures_key(request)
+        window = getattr(settings, "LOGIN_FAILURE_WINDOW", 15 * 60)
+        if not cache.add(key, 1, window):
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.add(key, 1, window)
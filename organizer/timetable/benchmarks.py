@@ -0,0 +1,155 @@
+import datetime
+import statistics
+import time
+from dataclasses import dataclass
+
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+
+from timetable.caching import cache_stats
+from timetable.models import CustomUser, Reservation
+from timetable.synthetic import SyntheticDataGenerator, Volumes
+
+SLOT_DAYS = 730
+SKIPPED_ROUTES = {"logout"}
+
+
+@dataclass
+class SeededObjects:
+    staff: CustomUser
+    employee_id: int
+    team_id: int
+    service_id: int
+    reservation_id: int
+
+
+def seed(reservations):
+    """
+    Fills empty database with synthetic data around given number of reservations
+    (see timetable.synthetic) and creates staff user making requests.
+    """
+    staff = CustomUser.objects.create_superuser(email="staff@benchmark.com", password="123")
+    generator = SyntheticDataGenerator(seed=0, days=SLOT_DAYS).generate(
+        Volumes.for_reservations(reservations, SLOT_DAYS)
+    )
+    return SeededObjects(
+        staff=staff,
+        employee_id=generator.employee_ids[0],
+        team_id=generator.team_ids[0],
+        service_id=generator.service_ids[0],
+        reservation_id=Reservation.objects.order_by("id").values_list("id", flat=True)[0],
+    )
+
+
+def route_kwargs(objects):
+    """
+    Returns URL arguments of every route which needs them.
+    """
+    today = datetime.date.today().isoformat()
+    return {
+        "user-details": {"user_id": objects.staff.pk},
+        "user-reservations": {"user_id": objects.staff.pk},
+        "recurring-reservations": {"user_id": objects.staff.pk},
+        "delete-user": {"user_id": objects.staff.pk},
+        "modify-user": {"pk": objects.staff.pk},
+        "employee-details": {"employee_id": objects.employee_id},
+        "delete-employee": {"employee_id": objects.employee_id},
+        "modify-employee": {"pk": objects.employee_id},
+        "team-details": {"team_id": objects.team_id},
+        "delete-team": {"team_id": objects.team_id},
+        "modify-team": {"pk": objects.team_id},
+        "team-availability": {"team_id": objects.team_id},
+        "delete-service": {"service_id": objects.service_id},
+        "check-reservation": {"date": today, "service": objects.service_id},
+        "service-availability": {"service": objects.service_id},
+        "reservation-details": {"reservation_id": objects.reservation_id},
+        "manage-reservation": {"pk": objects.reservation_id},
+    }
+
+
+def route_urls(objects, names=None):
+    """
+    Returns (name, url) of named routes of project urls, skipping routes
+    with arguments unknown to route_kwargs.
+    """
+    kwargs = route_kwargs(objects)
+    urls = []
+    for pattern in get_resolver().url_patterns:
+        name = getattr(pattern, "name", None)
+        if name is None or name in SKIPPED_ROUTES or (names and name not in names):
+            continue
+        if pattern.pattern.converters and name not in kwargs:
+            continue
+        urls.append((name, reverse(name, kwargs=kwargs.get(name))))
+    return urls
+
+
+def measure(client, url, repeat):
+    """
+    Requests url `repeat` times after one warm-up request, each in rolled back
+    savepoint, and returns p50 and p95 latency in milliseconds with query count.
+    """
+    timings = []
+    queries = 0
+    for i in range(repeat + 1):
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = client.get(url)
+                if response.streaming:
+                    b"".join(response.streaming_content)
+                duration = (time.perf_counter() - start) * 1000
+                queries = len(captured)
+            transaction.set_rollback(True)
+        if i:
+            timings.append(duration)
+    percentiles = statistics.quantiles(timings, n=100, method="inclusive")
+    return {
+        "status": response.status_code,
+        "p50": round(statistics.median(timings), 3),
+        "p95": round(percentiles[94], 3),
+        "queries": queries,
+    }
+
+
+def run_scale(client, reservations, repeat, names=None):
+    """
+    Seeds database with given number of reservations and measures every route.
+    Database is rolled back afterwards.
+    """
+    results = {}
+    with transaction.atomic():
+        objects = seed(reservations)
+        for cache in caches.all():
+            cache.clear()
+        cache_stats.clear()
+        client.force_login(objects.staff)
+        for name, url in route_urls(objects, names):
+            results[name] = measure(client, url, repeat)
+        transaction.set_rollback(True)
+    return results
+
+
+def regressions(results, baseline, threshold):
+    """
+    Returns descriptions of routes whose p95 latency grew over baseline by more
+    than `threshold` fraction or which run more queries than in baseline.
+    """
+    problems = []
+    for scale, routes in results.items():
+        for name, result in routes.items():
+            expected = baseline.get(scale, {}).get(name)
+            if expected is None:
+                continue
+            if result["p95"] > expected["p95"] * (1 + threshold):
+                problems.append(
+                    f"{scale} {name}: p95 {result['p95']} ms, baseline {expected['p95']} ms"
+                )
+            if result["queries"] > expected["queries"]:
+                problems.append(
+                    f"{scale} {name}: {result['queries']} queries, "
+                    f"baseline {expected['queries']}"
+                )
+    return problems
@@ -0,0 +1,302 @@
+import datetime
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Case, DateTimeField, F, Max, Subquery, Value, When
+from django.db.models.functions import Greatest
+from django.http import HttpResponse
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+
+def get_cache():
+    return caches[getattr(settings, "RESPONSE_CACHE_ALIAS", "default")]
+
+
+def version_key(model):
+    return f"version:{model._meta.label_lower}"
+
+
+def model_versions(*models):
+    """
+    Returns current versions of given models, starting missing ones with current time,
+    so version lost with evicted key never repeats value of cached pages.
+    """
+    cache = get_cache()
+    keys = [version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def latest_changes(*models):
+    """
+    Returns time of last change of every given model: latest `updated_at` of its rows
+    or last deletion recorded in its change mark, whichever is later. Both are read
+    with one query over marks seeded by migration 0011, latest `updated_at` from
+    its index. Model without mark falls back to its rows alone.
+    """
+    ModelChangeMark = apps.get_model("timetable", "ModelChangeMark")
+    by_label = {model._meta.label_lower: model for model in models}
+    rows = (
+        ModelChangeMark.objects.filter(model__in=by_label)
+        .annotate(
+            latest=Case(
+                *(
+                    When(model=label, then=latest_update(model))
+                    for label, model in by_label.items()
+                ),
+                output_field=DateTimeField(),
+            )
+        )
+        .values_list("model", "changed_at", "latest")
+    )
+    stamps = {
+        label: max(stamp for stamp in (changed_at, latest) if stamp is not None)
+        for label, changed_at, latest in rows
+    }
+    for label, model in by_label.items():
+        if label not in stamps:
+            stamps[label] = model.objects.aggregate(latest=Max("updated_at"))["latest"]
+    return [stamps[model._meta.label_lower] for model in models]
+
+
+def latest_update(model):
+    return Subquery(model.objects.order_by("-updated_at").values("updated_at")[:1])
+
+
+def start_of_day():
+    return timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def on_commit_once(key, func):
+    """
+    Runs func after current transaction commits, once per key however many times
+    it's requested in the transaction.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        func()
+        return
+    hooks, keys = getattr(connection, "commit_once_keys", (None, None))
+    # List of hooks is replaced when transaction ends or savepoint is rolled back,
+    # so keys of another transaction are never reused.
+    if hooks is not connection.run_on_commit:
+        keys = set()
+        connection.commit_once_keys = (connection.run_on_commit, keys)
+    if key not in keys:
+        keys.add(key)
+
+        def run():
+            keys.discard(key)
+            func()
+
+        transaction.on_commit(run)
+
+
+def bump_version(model):
+    """
+    Increments model version after current transaction commits, which makes every
+    cached page depending on model stale.
+    """
+    transaction.on_commit(lambda: _increment(version_key(model)))
+
+
+def mark_deleted(model):
+    """
+    Moves change mark of model forward after current transaction commits. Saved
+    rows carry their own `updated_at`, so only deletions need the mark.
+    """
+    on_commit_once(model, lambda: mark_changed(model))
+
+
+def mark_changed(model):
+    """
+    Moves change mark of model forward to current time. Mark never goes back,
+    even when clocks of application servers differ.
+    """
+    ModelChangeMark = apps.get_model("timetable", "ModelChangeMark")
+    label = model._meta.label_lower
+    now = timezone.now()
+    updated = ModelChangeMark.objects.filter(model=label).update(
+        changed_at=Greatest(F("changed_at"), Value(now, output_field=DateTimeField()))
+    )
+    if not updated:
+        ModelChangeMark.objects.bulk_create(
+            [ModelChangeMark(model=label, changed_at=now)], ignore_conflicts=True
+        )
+
+
+def _increment(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+class CacheStats:
+    """
+    Counts response cache hits and misses per view in current process.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def record(self, view_name, hit):
+        with self.lock:
+            (self.hits if hit else self.misses)[view_name] += 1
+
+    def clear(self):
+        with self.lock:
+            self.hits.clear()
+            self.misses.clear()
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                name: {"hits": self.hits[name], "misses": self.misses[name]}
+                for name in sorted(self.hits.keys() | self.misses.keys())
+            }
+
+
+cache_stats = CacheStats()
+
+
+class VersionedCacheMixin:
+    """
+    Caches rendered GET responses under key built from request path, user
+    and versions of `cache_models`. Versions are bumped on every change of those
+    models (see timetable.signals), so cached page is never served after data changed.
+    Has to be placed after permission mixins, so access is checked before cache lookup.
+    """
+
+    cache_models = ()
+
+    def get_cache_key(self, request):
+        versions = model_versions(*self.cache_models)
+        raw = "|".join(
+            [
+                request.get_full_path(),
+                str(request.user.pk),
+                datetime.date.today().isoformat(),
+                *map(str, versions),
+            ]
+        )
+        digest = hashlib.md5(raw.encode()).hexdigest()
+        return f"response:{type(self).__name__}:{digest}"
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return super().dispatch(request, *args, **kwargs)
+        cache = get_cache()
+        view_name = type(self).__name__
+        key = self.get_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            cache_stats.record(view_name, hit=True)
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response["X-Cache"] = "HIT"
+            return response
+        cache_stats.record(view_name, hit=False)
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming:
+            if hasattr(response, "render"):
+                response.render()
+            timeout = getattr(settings, "RESPONSE_CACHE_TIMEOUT", 60 * 60 * 24)
+            cache.set(key, (response.content, response["Content-Type"]), timeout)
+        response["X-Cache"] = "MISS"
+        return response
+
+
+class ConditionalResponseMixin:
+    """
+    Answers GET requests with 304 Not Modified when client already has current page.
+    ETag and Last-Modified come from times of last change of `condition_models`
+    read with one query, so neither needs the page to be rendered. ETag also holds
+    their versions, as row saved with earlier `updated_at` may commit after later
+    one, and session and CSRF cookie, so page with stale CSRF token of its forms
+    isn't kept after login. Has to be placed after permission mixins.
+    """
+
+    condition_models = ()
+
+    def get_condition_stamps(self, request, *args, **kwargs):
+        """
+        Returns times of changes the page depends on, read once per request.
+        """
+        if not hasattr(self, "_condition_stamps"):
+            self._condition_stamps = latest_changes(*self.condition_models)
+        return self._condition_stamps
+
+    def get_etag(self, request, *args, **kwargs):
+        stamps = self.get_condition_stamps(request, *args, **kwargs)
+        if None in stamps:
+            return None
+        raw = "|".join(
+            [
+                request.get_full_path(),
+                str(request.user.pk),
+                # Pages render CSRF token of forms, which changes with login.
+                request.session.session_key or "",
+                request.COOKIES.get(settings.CSRF_COOKIE_NAME, ""),
+                datetime.date.today().isoformat(),
+                *(stamp.isoformat() for stamp in stamps),
+                *map(str, model_versions(*self.condition_models)),
+            ]
+        )
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def get_last_modified(self, request, *args, **kwargs):
+        stamps = self.get_condition_stamps(request, *args, **kwargs)
+        if None in stamps:
+            return None
+        # Pages compare reservations with today's date, so they change at midnight.
+        return max([start_of_day(), *stamps])
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return super().dispatch(request, *args, **kwargs)
+        conditional = condition(
+            etag_func=self.get_etag, last_modified_func=self.get_last_modified
+        )
+        return conditional(super().dispatch)(request, *args, **kwargs)
+
+
+class ConditionalObjectMixin(ConditionalResponseMixin):
+    """
+    ConditionalResponseMixin for page of single `condition_object_model` row
+    with primary key given as `condition_object_kwarg`. Its `updated_at` is read
+    from index next to last changes of other `condition_models`, so edits of other
+    rows don't make the page stale. Missing object is left to the view.
+    """
+
+    condition_object_model = None
+    condition_object_kwarg = None
+
+    def get_condition_stamps(self, request, *args, **kwargs):
+        if not hasattr(self, "_condition_stamps"):
+            updated_at = (
+                self.condition_object_model.objects.filter(
+                    pk=kwargs[self.condition_object_kwarg]
+                )
+                .values_list("updated_at", flat=True)
+                .first()
+            )
+            self._condition_stamps = [
+                updated_at,
+                *latest_changes(*self.condition_models),
+            ]
+        return self._condition_stamps
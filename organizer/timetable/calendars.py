@@ -0,0 +1,63 @@
+import calendar
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from timetable.models import Reservation, date_span
+
+
+@dataclass
+class CalendarEntry:
+    id: int
+    start: object
+    finish: object
+    is_accepted: bool
+    customer: str
+    service: str
+    teams: list = field(default_factory=list)
+
+
+def month_entries(start, end):
+    """
+    Returns reservations working between start and end with names of their customer,
+    service and teams, read with one query. Rows repeated for every team are merged
+    in memory.
+    """
+    rows = (
+        Reservation.objects.overlapping(start, end)
+        .order_by("target_date", "id", "teams__team_name")
+        .values_list(
+            "id",
+            "target_date",
+            "finish_date",
+            "is_accepted",
+            "customer__first_name",
+            "customer__last_name",
+            "service_type__service_name",
+            "teams__team_name",
+        )
+    )
+    entries = {}
+    for pk, target, finish, accepted, first_name, last_name, service, team in rows:
+        entry = entries.get(pk)
+        if entry is None:
+            entry = entries[pk] = CalendarEntry(
+                pk, target, finish, accepted, f"{first_name} {last_name}", service
+            )
+        if team is not None:
+            entry.teams.append(team)
+    return list(entries.values())
+
+
+def month_grid(start, end):
+    """
+    Returns weeks of month from start to end as lists of (date, entries, in_month),
+    every reservation placed on each of its days.
+    """
+    days = defaultdict(list)
+    for entry in month_entries(start, end):
+        for date in date_span(max(entry.start, start), min(entry.finish, end)):
+            days[date].append(entry)
+    return [
+        [(date, days[date], date.month == start.month) for date in week]
+        for week in calendar.Calendar().monthdatescalendar(start.year, start.month)
+    ]
@@ -0,0 +1,99 @@
+import datetime
+from collections import defaultdict
+from typing import NamedTuple
+
+from django.db.models import F
+
+from timetable.models import Reservation, Team, date_span, max_reservation_days
+
+ReservationTeam = Reservation.teams.through
+
+
+class TeamClash(NamedTuple):
+    team_id: int
+    team_name: str
+    reservation_id: int
+    start: object
+    finish: object
+    other_id: int
+    other_start: object
+    other_finish: object
+
+
+def clashing_teams(team_ids, start, finish, exclude=None):
+    """
+    Returns teams among given ones which already work on any day from start to finish.
+    Reservations overlapping the span come from date range of reservation index,
+    their teams from (reservation, team) index of teams table, all in one query.
+    """
+    reservations = Reservation.objects.overlapping(start, finish)
+    if exclude is not None:
+        reservations = reservations.exclude(pk=exclude)
+    return Team.objects.filter(pk__in=team_ids, reservation__in=reservations).distinct()
+
+
+def batch_clashes(reservations, team_ids):
+    """
+    Returns sorted (team id, date) pairs on which assigning given teams to every
+    reservation of queryset would book team twice, counting clashes with existing
+    assignments and between reservations of the batch. Runs two queries.
+    """
+    team_ids = set(team_ids)
+    spans = list(reservations.values_list("pk", "target_date", "finish_date"))
+    if not spans or not team_ids:
+        return []
+    booked = ReservationTeam.objects.filter(
+        team_id__in=team_ids,
+        reservation__in=Reservation.objects.overlapping(
+            min(start for pk, start, finish in spans),
+            max(finish for pk, start, finish in spans),
+        ),
+    ).exclude(reservation_id__in=[pk for pk, start, finish in spans])
+    taken = defaultdict(set)
+    for team_id, start, finish in booked.values_list(
+        "team_id", "reservation__target_date", "reservation__finish_date"
+    ):
+        taken[team_id].update(date_span(start, finish))
+    clashes = set()
+    for pk, start, finish in spans:
+        for date in date_span(start, finish):
+            for team_id in team_ids:
+                if date in taken[team_id]:
+                    clashes.add((team_id, date))
+                taken[team_id].add(date)
+    return sorted(clashes)
+
+
+def team_clashes(start, end):
+    """
+    Returns every pair of reservations sharing a team on overlapping days, for
+    reservations working between start and end. Pairs come from one self join of
+    teams table, walked from date range of reservations. Like
+    ReservationQuerySet.overlapping() both sides are bounded from below using
+    MAX_RESERVATION_DAYS, so only the index range near start is read.
+    """
+    max_days = datetime.timedelta(days=max_reservation_days())
+    earliest = start - max_days
+    rows = (
+        ReservationTeam.objects.filter(
+            reservation__target_date__gt=earliest,
+            reservation__target_date__lte=end,
+            reservation__finish_date__gte=start,
+            team__reservation__id__gt=F("reservation_id"),
+            team__reservation__target_date__gt=earliest - max_days,
+            team__reservation__target_date__lte=F("reservation__finish_date"),
+            team__reservation__finish_date__gte=F("reservation__target_date"),
+        )
+        .order_by("reservation__target_date", "team__team_name", "reservation_id")
+        .values_list(
+            "team_id",
+            "team__team_name",
+            "reservation_id",
+            "reservation__target_date",
+            "reservation__finish_date",
+            "team__reservation__id",
+            "team__reservation__target_date",
+            "team__reservation__finish_date",
+        )
+    )
+    return [TeamClash(*row) for row in rows]
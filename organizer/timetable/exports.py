@@ -0,0 +1,108 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+CHUNK_SIZE = 2000
+EXPORT_FIELDS = (
+    "id",
+    "target_date",
+    "finish_date",
+    "is_accepted",
+    "comments",
+    "customer_id",
+    "customer__first_name",
+    "customer__last_name",
+    "customer__email",
+    "service_type_id",
+    "service_type__service_name",
+)
+
+
+def reservation_rows(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Yields reservations of queryset as dicts with names of customer, service and teams.
+    Rows are read with one query through server-side cursor in chunks, ordered by
+    (target_date, id) so rows repeated for every team come one after another and
+    are merged without keeping more than one reservation in memory.
+    """
+    rows = (
+        queryset.order_by("target_date", "id")
+        .values_list(*EXPORT_FIELDS, "teams__team_name")
+        .iterator(chunk_size=chunk_size)
+    )
+    current = None
+    for *values, team in rows:
+        if current is None or current["id"] != values[0]:
+            if current is not None:
+                yield current
+            current = export_row(values)
+        if team is not None:
+            current["teams"].append(team)
+    if current is not None:
+        yield current
+
+
+def export_row(values):
+    (
+        pk,
+        target_date,
+        finish_date,
+        is_accepted,
+        comments,
+        customer_id,
+        first_name,
+        last_name,
+        email,
+        service_id,
+        service_name,
+    ) = values
+    return {
+        "id": pk,
+        "target_date": target_date,
+        "finish_date": finish_date,
+        "is_accepted": is_accepted,
+        "comments": comments,
+        "customer": {
+            "id": customer_id,
+            "name": f"{first_name} {last_name}",
+            "email": email,
+        },
+        "service": {"id": service_id, "name": service_name},
+        "teams": [],
+    }
+
+
+def dumps(row):
+    return json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def batched(lines, size=CHUNK_SIZE):
+    """
+    Joins lines into strings of at most `size` lines, so response isn't written
+    to socket row by row.
+    """
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) == size:
+            yield "".join(batch)
+            batch = []
+    if batch:
+        yield "".join(batch)
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield dumps(row) + "\n"
+
+
+def json_array(rows):
+    """
+    Yields rows as pieces of single JSON array.
+    """
+    yield "["
+    separator = "\n"
+    for row in rows:
+        yield separator + dumps(row)
+        separator = ",\n"
+    yield "\n]\n"
@@ -0,0 +1,63 @@
+import hashlib
+
+from django import forms
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.forms.models import ModelChoiceIterator, ModelChoiceIteratorValue
+
+from timetable.caching import get_cache, model_versions
+
+
+class CachedModelChoiceIterator(ModelChoiceIterator):
+    """
+    Yields choices from cached (pk, label) list instead of querying database.
+    """
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for pk, label in self.field.cached_choices():
+            yield (ModelChoiceIteratorValue(pk, None), label)
+
+    def __len__(self):
+        extra = 1 if self.field.empty_label is not None else 0
+        return len(self.field.cached_choices()) + extra
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(self.field.cached_choices())
+
+
+class CachedChoicesMixin:
+    """
+    Keeps choices of model choice field in cache as list of (pk, label) pairs.
+    Key contains model version, so list is rebuilt once model changes
+    (see timetable.caching). Submitted values are still validated against database.
+    Cache is always filled from primary database, so replica lag never gets stored
+    under new version.
+    """
+
+    iterator = CachedModelChoiceIterator
+
+    def cached_choices(self):
+        model = self.queryset.model
+        (version,) = model_versions(model)
+        query = hashlib.md5(str(self.queryset.query).encode()).hexdigest()
+        key = f"choices:{model._meta.label_lower}:{query}:{version}"
+        cache = get_cache()
+        choices = cache.get(key)
+        if choices is None:
+            choices = [
+                (obj.pk, self.label_from_instance(obj))
+                for obj in self.queryset.using(DEFAULT_DB_ALIAS)
+            ]
+            timeout = getattr(settings, "RESPONSE_CACHE_TIMEOUT", 60 * 60 * 24)
+            cache.set(key, choices, timeout)
+        return choices
+
+
+class CachedModelChoiceField(CachedChoicesMixin, forms.ModelChoiceField):
+    pass
+
+
+class CachedModelMultipleChoiceField(CachedChoicesMixin, forms.ModelMultipleChoiceField):
+    pass
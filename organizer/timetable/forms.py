@@ -1,7 +1,19 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
 
-from .models import Employee, Team, Reservation, CustomUser
+from .availability import availability_index
+from .conflicts import clashing_teams
+from .fields import CachedModelChoiceField, CachedModelMultipleChoiceField
+from .recurrence import Recurrence
+from .models import (
+    Employee,
+    Team,
+    Reservation,
+    RecurringReservation,
+    CustomUser,
+    Services,
+    max_reservation_days,
+)
 
 
 class AddUserForm(forms.Form):
@@ -22,7 +34,7 @@ class AddEmployeeForm(forms.Form):
 
 class AddTeamForm(forms.Form):
     team_name = forms.CharField(label="Nazwa zespołu", max_length=64)
-    employees = forms.ModelMultipleChoiceField(
+    employees = CachedModelMultipleChoiceField(
         label="Dodaj pracowników do zespołu",
         queryset=Employee.objects.all(),
         widget=forms.CheckboxSelectMultiple(),
@@ -30,9 +42,12 @@ class AddTeamForm(forms.Form):
 
 
 class AddUserReservationForm(forms.ModelForm):
+    date_taken_message = "Wybrany termin jest zajęty"
+
     class Meta:
         model = Reservation
-        fields = ["service_type", "target_date", "comments"]
+        fields = ["service_type", "target_date", "finish_date", "comments"]
+        field_classes = {"service_type": CachedModelChoiceField}
         widgets = {
             "target_date": forms.DateInput(
                 format="%m/%d/%Y",
@@ -42,12 +57,268 @@ class AddUserReservationForm(forms.ModelForm):
                     "type": "date",
                     "style": "width:20%",
                 },
-            )
+            ),
+            "finish_date": forms.DateInput(
+                format="%m/%d/%Y",
+                attrs={
+                    "class": "form-control",
+                    "placeholder": "Select a date",
+                    "type": "date",
+                    "style": "width:20%",
+                },
+            ),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Reservation without finish date lasts single day.
+        self.fields["finish_date"].required = False
+
+    def clean(self):
+        cleaned_data = super().clean()
+        service = cleaned_data.get("service_type")
+        target_date = cleaned_data.get("target_date")
+        if target_date and "finish_date" not in self.errors:
+            cleaned_data["finish_date"] = cleaned_data.get("finish_date") or target_date
+        finish_date = cleaned_data.get("finish_date")
+        # Spans out of order or too long are rejected by Reservation.clean().
+        if (
+            service
+            and target_date
+            and finish_date
+            and 0 <= (finish_date - target_date).days < max_reservation_days()
+        ):
+            if not availability_index.is_available(service.pk, target_date, finish_date):
+                raise forms.ValidationError(self.date_taken_message)
+        return cleaned_data
+
+    def validate_unique(self):
+        # Free date is already checked against availability index in clean(),
+        # database constraint still guards against concurrent bookings.
+        exclude = {*self._get_validation_exclusions(), "target_date"}
+        try:
+            self.instance.validate_unique(exclude=exclude)
+        except forms.ValidationError as e:
+            self._update_errors(e)
+
+
+class RecurringReservationForm(forms.ModelForm):
+    class Meta:
+        model = RecurringReservation
+        fields = [
+            "service_type",
+            "frequency",
+            "interval",
+            "start_date",
+            "finish_date",
+            "comments",
+        ]
+        field_classes = {"service_type": CachedModelChoiceField}
+        widgets = {
+            "start_date": forms.DateInput(attrs={"type": "date"}),
+            "finish_date": forms.DateInput(attrs={"type": "date"}),
         }
 
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get("start_date")
+        finish_date = cleaned_data.get("finish_date")
+        if start_date and finish_date and finish_date < start_date:
+            raise forms.ValidationError("Ostatni termin jest wcześniejszy niż pierwszy")
+        if not self.errors:
+            self.check_conflicts()
+        return cleaned_data
+
+    def check_conflicts(self, fresh=False):
+        """
+        Adds form error when any occurrence of rule falls on taken date.
+        With `fresh` taken dates are read from database.
+        """
+        recurrence = Recurrence(
+            self.cleaned_data["start_date"],
+            self.cleaned_data.get("finish_date"),
+            self.cleaned_data["frequency"],
+            self.cleaned_data["interval"],
+        )
+        date = availability_index.rule_conflict(
+            self.cleaned_data["service_type"].pk, recurrence, fresh
+        )
+        if date is not None:
+            self.add_error(None, f"Termin {date.isoformat()} jest zajęty")
+        return date is None
+
+
+class ListingFilterForm(forms.Form):
+    """
+    Base form for filtering staff listings. Every filled field listed in `lookups`
+    is applied to queryset with its ORM lookup.
+    """
+
+    PAGE_SIZES = (("", "Domyślnie"), ("25", "25"), ("50", "50"), ("100", "100"))
+    lookups = {}
+
+    page_size = forms.TypedChoiceField(
+        label="Na stronie", choices=PAGE_SIZES, coerce=int, required=False
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.order_fields([name for name in self.fields if name != "page_size"])
+
+    def filter(self, queryset):
+        for field, lookup in self.lookups.items():
+            value = self.cleaned_data.get(field)
+            if value not in (None, ""):
+                queryset = queryset.filter(**{lookup: value})
+        return queryset
+
+
+class UserFilterForm(ListingFilterForm):
+    lookups = {"email": "email__startswith"}
+
+    email = forms.CharField(label="Email zaczyna się od", required=False)
+
+
+class EmployeeFilterForm(ListingFilterForm):
+    lookups = {"surname": "employee_surname__startswith", "job": "job"}
+
+    surname = forms.CharField(label="Nazwisko zaczyna się od", required=False)
+    job = forms.ChoiceField(
+        label="Funkcja", choices=(("", "Wszystkie"),) + Employee.JOBS, required=False
+    )
+
+
+class TeamFilterForm(ListingFilterForm):
+    lookups = {"team_name": "team_name__startswith"}
+
+    team_name = forms.CharField(label="Nazwa zaczyna się od", required=False)
+
+
+class ServiceFilterForm(ListingFilterForm):
+    lookups = {"service_name": "service_name__startswith"}
+
+    service_name = forms.CharField(label="Nazwa zaczyna się od", required=False)
+
+
+class ModifyTeamForm(forms.ModelForm):
+    class Meta:
+        model = Team
+        fields = ["team_name", "employees"]
+        field_classes = {"employees": CachedModelMultipleChoiceField}
+
+
+class ManageReservationForm(forms.ModelForm):
+    class Meta:
+        model = Reservation
+        fields = [
+            "customer",
+            "teams",
+            "target_date",
+            "finish_date",
+            "comments",
+            "is_accepted",
+            "service_type",
+        ]
+        field_classes = {
+            "customer": CachedModelChoiceField,
+            "teams": CachedModelMultipleChoiceField,
+            "service_type": CachedModelChoiceField,
+        }
+
+    def clean(self):
+        cleaned_data = super().clean()
+        service = cleaned_data.get("service_type")
+        target_date = cleaned_data.get("target_date")
+        finish_date = cleaned_data.get("finish_date")
+        if service and target_date and finish_date and finish_date >= target_date:
+            overlapping = (
+                Reservation.objects.filter(service_type=service)
+                .overlapping(target_date, finish_date)
+                .exclude(pk=self.instance.pk)
+            )
+            if overlapping.exists():
+                raise forms.ValidationError(AddUserReservationForm.date_taken_message)
+            self.check_teams(target_date, finish_date)
+        return cleaned_data
+
+    def check_teams(self, target_date, finish_date):
+        """
+        Adds error to teams field for every team already working in reservation span.
+        """
+        teams = self.cleaned_data.get("teams")
+        if not teams:
+            return
+        for team in clashing_teams(
+            [team.pk for team in teams], target_date, finish_date, exclude=self.instance.pk
+        ):
+            self.add_error("teams", f"Ekipa {team} ma już zlecenie w tym terminie")
+
+
+class ReservationFilterForm(ListingFilterForm):
+    STATUSES = (("", "Wszystkie"), ("pending", "Do zaakceptowania"), ("accepted", "Zaakceptowane"))
+    lookups = {
+        "date_from": "target_date__gte",
+        "date_to": "target_date__lte",
+        "service": "service_type",
+    }
+
+    date_from = forms.DateField(
+        label="Od", required=False, widget=forms.DateInput(attrs={"type": "date"})
+    )
+    date_to = forms.DateField(
+        label="Do", required=False, widget=forms.DateInput(attrs={"type": "date"})
+    )
+    service = CachedModelChoiceField(
+        label="Rodzaj usługi", queryset=Services.objects.all(), required=False
+    )
+    status = forms.ChoiceField(label="Status", choices=STATUSES, required=False)
+
+    def filter(self, queryset):
+        queryset = super().filter(queryset)
+        status = self.cleaned_data.get("status")
+        if status:
+            queryset = queryset.filter(is_accepted=status == "accepted")
+        return queryset
+
+
+class BatchReservationForm(forms.Form):
+    ACTIONS = (
+        ("accept", "Zaakceptuj"),
+        ("assign", "Tylko przydziel ekipy"),
+        ("reject", "Odrzuć"),
+    )
+    reservations = forms.ModelMultipleChoiceField(
+        queryset=Reservation.objects.filter(is_accepted=False),
+        widget=forms.MultipleHiddenInput,
+    )
+    teams = CachedModelMultipleChoiceField(
+        label="Ekipy",
+        queryset=Team.objects.all(),
+        widget=forms.CheckboxSelectMultiple(),
+        required=False,
+    )
+    action = forms.ChoiceField(label="Akcja", choices=ACTIONS)
+
 
 class AddServiceForm(forms.Form):
     service_name = forms.CharField(label="Rodzaj usługi", max_length=128)
+    min_team_size = forms.IntegerField(
+        label="Minimalna liczba pracowników", min_value=1, initial=1
+    )
+
+
+class ScheduleForm(forms.Form):
+    date_from = forms.DateField(label="Od", widget=forms.DateInput(attrs={"type": "date"}))
+    date_to = forms.DateField(label="Do", widget=forms.DateInput(attrs={"type": "date"}))
+    accept = forms.BooleanField(label="Zaakceptuj rezerwacje", required=False, initial=True)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get("date_from")
+        date_to = cleaned_data.get("date_to")
+        if date_from and date_to and date_to < date_from:
+            raise forms.ValidationError("Data końcowa jest wcześniejsza niż początkowa")
+        return cleaned_data
 
 
 class LoginForm(forms.Form):
@@ -0,0 +1,310 @@
+import csv
+import datetime
+import json
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+
+from timetable import workload
+from timetable.availability import availability_index
+from timetable.caching import bump_version
+from timetable.models import (
+    CustomUser,
+    Reservation,
+    Services,
+    Team,
+    date_span,
+    max_reservation_days,
+)
+
+ReservationTeam = Reservation.teams.through
+TRUE_VALUES = {"1", "true", "yes", "tak", "t", "y"}
+
+
+class RowError(Exception):
+    pass
+
+
+def read_csv(file):
+    reader = csv.DictReader(file)
+    for row in reader:
+        teams = row.get("teams") or ""
+        row["teams"] = [team.strip() for team in teams.split(";") if team.strip()]
+        yield row
+
+
+def read_jsonl(file):
+    """
+    Yields rows of JSON lines file. Line which isn't JSON object is yielded
+    under "invalid" key, so it ends up in rejects instead of stopping import.
+    """
+    for line in file:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield row if isinstance(row, dict) else {"invalid": line.strip()}
+
+
+class RejectsWriter:
+    """
+    Writes rejected rows with error message to CSV or JSONL file, opened on first reject.
+    """
+
+    def __init__(self, path, file_format):
+        self.path = path
+        self.file_format = file_format
+        self.file = None
+        self.writer = None
+
+    def write(self, row, error):
+        if self.path is None:
+            return
+        row = {**row, "error": error}
+        if self.file is None:
+            self.file = open(self.path, "w", newline="", encoding="utf-8")
+        if self.file_format == "jsonl":
+            self.file.write(json.dumps(row, default=str) + "\n")
+            return
+        row["teams"] = ";".join(str(team) for team in row.get("teams") or [])
+        if self.writer is None:
+            self.writer = csv.DictWriter(
+                self.file, fieldnames=list(row), restval="", extrasaction="ignore"
+            )
+            self.writer.writeheader()
+        self.writer.writerow(row)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+class ReservationImporter:
+    """
+    Imports reservations in chunks. Customers, services and teams are resolved
+    with cached lookups, rows whose days clash with existing reservations or with
+    each other for the same service or team are rejected before insert, and every chunk
+    is saved with bulk inserts of reservations and their teams.
+    """
+
+    def __init__(self, rejects, chunk_size=1000):
+        self.rejects = rejects
+        self.chunk_size = chunk_size
+        self.services = {}
+        for service_id, name in Services.objects.values_list("id", "service_name"):
+            self.services[str(service_id)] = service_id
+            self.services.setdefault(name, service_id)
+        self.teams = {}
+        for team_id, name in Team.objects.values_list("id", "team_name"):
+            self.teams[str(team_id)] = team_id
+            self.teams.setdefault(name, team_id)
+        self.customers = {}
+        self.seen_slots = set()
+        self.seen_team_days = set()
+        self.touched_services = set()
+        self.touched_teams = set()
+        self.workload_teams = set()
+        self.workload_dates = set()
+        self.imported = 0
+        self.rejected = 0
+
+    def run(self, rows):
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(chunk)
+        for service_id in self.touched_services:
+            availability_index.invalidate(service_id)
+        if self.imported:
+            bump_version(Reservation)
+        if self.touched_teams:
+            # Assignments are bulk inserted, so teams get new timestamps at once.
+            Team.objects.filter(pk__in=self.touched_teams).touch()
+            bump_version(Team)
+        if self.workload_teams:
+            workload.refresh_teams(self.workload_teams, self.workload_dates)
+
+    def reject(self, row, error):
+        self.rejected += 1
+        self.rejects.write(row, error)
+
+    def resolve_customers(self, chunk):
+        missing = {
+            CustomUser.objects.normalize_email(row.get("customer") or "")
+            for row in chunk
+        } - self.customers.keys()
+        self.customers.update(dict.fromkeys(missing))
+        self.customers.update(
+            CustomUser.objects.filter(email__in=missing).values_list("email", "id")
+        )
+
+    def parse(self, row):
+        """
+        Returns unsaved reservation and ids of its teams built from row.
+        """
+        if "invalid" in row:
+            raise RowError("invalid JSON line")
+        email = CustomUser.objects.normalize_email(row.get("customer") or "")
+        customer_id = self.customers.get(email)
+        if customer_id is None:
+            raise RowError(f"unknown customer {email!r}")
+        service_id = self.services.get(str(row.get("service") or ""))
+        if service_id is None:
+            raise RowError(f"unknown service {row.get('service')!r}")
+        try:
+            target_date = datetime.date.fromisoformat(str(row.get("target_date") or ""))
+        except ValueError:
+            raise RowError(f"invalid date {row.get('target_date')!r}")
+        try:
+            finish_date = (
+                datetime.date.fromisoformat(str(row["finish_date"]))
+                if row.get("finish_date")
+                else target_date
+            )
+        except ValueError:
+            raise RowError(f"invalid finish date {row.get('finish_date')!r}")
+        if not 0 <= (finish_date - target_date).days < max_reservation_days():
+            raise RowError(
+                f"reservation must last from 1 to {max_reservation_days()} days"
+            )
+        team_ids = []
+        for team in row.get("teams") or []:
+            if str(team) not in self.teams:
+                raise RowError(f"unknown team {team!r}")
+            team_ids.append(self.teams[str(team)])
+        reservation = Reservation(
+            customer_id=customer_id,
+            service_type_id=service_id,
+            target_date=target_date,
+            finish_date=finish_date,
+            comments=row.get("comments") or None,
+            is_accepted=str(row.get("is_accepted") or "").lower() in TRUE_VALUES,
+        )
+        return reservation, team_ids
+
+    def import_chunk(self, chunk):
+        self.resolve_customers(chunk)
+        parsed = []
+        for row in chunk:
+            try:
+                parsed.append((row, *self.parse(row)))
+            except RowError as error:
+                self.reject(row, str(error))
+        existing = self.existing_slots([r for row, r, teams in parsed])
+        team_days = self.existing_team_days(parsed)
+        accepted = []
+        for row, reservation, team_ids in parsed:
+            slots = [(date, reservation.service_type_id) for date in reservation.dates]
+            if any(slot in existing or slot in self.seen_slots for slot in slots):
+                self.reject(row, "date already reserved for this service")
+                continue
+            booked = [(date, team) for date in reservation.dates for team in team_ids]
+            if any(day in team_days or day in self.seen_team_days for day in booked):
+                self.reject(row, "team already booked on this date")
+                continue
+            rules = availability_index.rules(reservation.service_type_id)
+            if any(rule.occurs_on(date) for rule in rules for date in reservation.dates):
+                self.reject(row, "date taken by recurring reservation")
+                continue
+            self.seen_slots.update(slots)
+            self.seen_team_days.update(booked)
+            accepted.append((row, reservation, team_ids))
+        try:
+            with transaction.atomic():
+                self.save(accepted)
+        except IntegrityError:
+            # Conflicting reservation was added concurrently, fall back to row by row inserts.
+            for row, reservation, team_ids in accepted:
+                reservation.pk = None
+            for item in accepted:
+                try:
+                    with transaction.atomic():
+                        self.save([item])
+                except IntegrityError as error:
+                    self.reject(item[0], str(error))
+        self.touched_services.update(
+            reservation.service_type_id for row, reservation, team_ids in parsed
+        )
+
+    def existing_slots(self, reservations):
+        """
+        Returns (date, service id) of every day taken by saved reservations
+        overlapping given ones, read with single query.
+        """
+        if not reservations:
+            return set()
+        spans = (
+            Reservation.objects.filter(
+                service_type_id__in={r.service_type_id for r in reservations}
+            )
+            .overlapping(
+                min(r.target_date for r in reservations),
+                max(r.finish_date for r in reservations),
+            )
+            .values_list("target_date", "finish_date", "service_type_id")
+        )
+        return {
+            (date, service_id)
+            for target_date, finish_date, service_id in spans
+            for date in date_span(target_date, finish_date)
+        }
+
+    def existing_team_days(self, parsed):
+        """
+        Returns (date, team id) of every day on which teams of given rows already
+        work, read with single query.
+        """
+        team_ids = {team for row, r, teams in parsed for team in teams}
+        if not team_ids:
+            return set()
+        rows = ReservationTeam.objects.filter(
+            team_id__in=team_ids,
+            reservation__in=Reservation.objects.overlapping(
+                min(r.target_date for row, r, teams in parsed),
+                max(r.finish_date for row, r, teams in parsed),
+            ),
+        ).values_list("team_id", "reservation__target_date", "reservation__finish_date")
+        return {
+            (date, team_id)
+            for team_id, target_date, finish_date in rows
+            for date in date_span(target_date, finish_date)
+        }
+
+    def save(self, items):
+        reservations = Reservation.objects.bulk_create(
+            [reservation for row, reservation, team_ids in items],
+            batch_size=self.chunk_size,
+        )
+        if reservations and reservations[0].pk is None:
+            self.fetch_ids(reservations)
+        ReservationTeam.objects.bulk_create(
+            [
+                ReservationTeam(reservation_id=reservation.pk, team_id=team_id)
+                for (row, reservation, team_ids) in items
+                for team_id in team_ids
+            ],
+            batch_size=self.chunk_size,
+            ignore_conflicts=True,
+        )
+        self.imported += len(items)
+        for row, reservation, team_ids in items:
+            self.touched_teams.update(team_ids)
+            if reservation.is_accepted and team_ids:
+                self.workload_teams.update(team_ids)
+                self.workload_dates.add(reservation.target_date)
+
+    def fetch_ids(self, reservations):
+        """
+        Sets primary keys on backends which don't return them from bulk insert.
+        """
+        rows = Reservation.objects.filter(
+            target_date__in={r.target_date for r in reservations},
+            service_type_id__in={r.service_type_id for r in reservations},
+        ).values_list("pk", "target_date", "service_type_id")
+        ids = {(date, service_id): pk for pk, date, service_id in rows}
+        for reservation in reservations:
+            reservation.pk = ids[(reservation.target_date, reservation.service_type_id)]
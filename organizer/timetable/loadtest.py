@@ -0,0 +1,285 @@
+import asyncio
+import datetime
+import random
+import statistics
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, connections
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+from timetable.models import CustomUser, Reservation, Services
+
+EMAIL_DOMAIN = "loadtest.example.com"
+FORM_CONTENT_TYPE = "application/x-www-form-urlencoded"
+UNIQUE_SLOT_MARKERS = (
+    "unique service_date",
+    "timetable_reservation.target_date",
+    "reservation_service_no_overlap",
+)
+
+
+@dataclass
+class LoadTestResult:
+    """
+    Latencies in seconds and outcomes of every step of reservation flow.
+    """
+
+    duration: float = 0.0
+    latencies: dict = field(default_factory=lambda: defaultdict(list))
+    statuses: dict = field(default_factory=lambda: defaultdict(Counter))
+    outcomes: Counter = field(default_factory=Counter)
+    integrity_errors: Counter = field(default_factory=Counter)
+
+    def __post_init__(self):
+        self.lock = threading.Lock()
+
+    def record(self, step, latency, status):
+        with self.lock:
+            self.latencies[step].append(latency)
+            self.statuses[step][status] += 1
+
+    def count(self, counter, key):
+        with self.lock:
+            counter[key] += 1
+
+    def summary(self):
+        requests = sum(len(latencies) for latencies in self.latencies.values())
+        steps = {}
+        for step, latencies in sorted(self.latencies.items()):
+            if len(latencies) < 2:
+                # Single sample is every percentile of the step.
+                percentiles = latencies * 99
+            else:
+                percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+            errors = sum(
+                count for status, count in self.statuses[step].items() if status >= 500
+            )
+            steps[step] = {
+                "requests": len(latencies),
+                "p50_ms": round(statistics.median(latencies) * 1000, 3),
+                "p95_ms": round(percentiles[94] * 1000, 3),
+                "p99_ms": round(percentiles[98] * 1000, 3),
+                "error_rate": round(errors / len(latencies), 4),
+            }
+        return {
+            "duration_s": round(self.duration, 3),
+            "requests": requests,
+            "requests_per_s": round(requests / self.duration, 2) if self.duration else 0,
+            "bookings_per_s": (
+                round(self.outcomes["booked"] / self.duration, 2) if self.duration else 0
+            ),
+            "outcomes": dict(self.outcomes),
+            "integrity_errors": dict(self.integrity_errors),
+            "steps": steps,
+        }
+
+
+@contextmanager
+def count_integrity_errors(result):
+    """
+    Counts IntegrityErrors raised by queries of every connection of current thread,
+    telling apart violations of unique (target_date, service_type) constraint.
+    """
+
+    def wrapper(execute, sql, params, many, context):
+        try:
+            return execute(sql, params, many, context)
+        except IntegrityError as error:
+            unique_slot = any(marker in str(error) for marker in UNIQUE_SLOT_MARKERS)
+            kind = "unique_service_date" if unique_slot else "other"
+            result.count(result.integrity_errors, kind)
+            raise
+
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(wrapper))
+        yield
+
+
+def prepare_customers(count):
+    """
+    Returns load test customers, creating missing ones with one shared password hash.
+    """
+    emails = [f"user{i}@{EMAIL_DOMAIN}" for i in range(count)]
+    existing = set(
+        CustomUser.objects.filter(email__in=emails).values_list("email", flat=True)
+    )
+    password = make_password(None)
+    CustomUser.objects.bulk_create(
+        CustomUser(email=email, password=password)
+        for email in emails
+        if email not in existing
+    )
+    return list(CustomUser.objects.filter(email__in=emails).order_by("email"))
+
+
+def cleanup():
+    """
+    Deletes load test customers together with reservations they made.
+    """
+    customers = CustomUser.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}")
+    Reservation.objects.filter(customer__in=customers).delete()
+    return customers.delete()
+
+
+class ReservationLoadTest:
+    """
+    Drives reservation flow in-process with concurrent virtual users: each of them
+    opens reservation form, checks picked date and books it when it looks free.
+    Dates are drawn from first `services` services and `days` days starting tomorrow,
+    so users compete for the same slots. WSGI mode runs every user in its own thread,
+    ASGI mode runs them as coroutines of AsyncClient.
+    """
+
+    def __init__(self, users, iterations, services=3, days=14, seed=0, think_time=0):
+        self.users = users
+        self.iterations = iterations
+        self.think_time = think_time
+        self.seed = seed
+        self.service_ids = list(
+            Services.objects.order_by("id").values_list("id", flat=True)[:services]
+        )
+        if not self.service_ids:
+            raise ValueError("At least one service is needed")
+        tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+        self.dates = [tomorrow + datetime.timedelta(days=i) for i in range(days)]
+        self.customers = prepare_customers(users)
+        self.result = LoadTestResult()
+
+    def run(self, mode="wsgi"):
+        start = time.perf_counter()
+        if mode == "asgi":
+            asyncio.run(self.run_async())
+        else:
+            # Users are logged in before threads start, so session writes don't
+            # compete with reservation flow.
+            threads = [
+                threading.Thread(target=self.run_user, args=(i, self.login(i)))
+                for i in range(self.users)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.result.duration = time.perf_counter() - start
+        return self.result
+
+    def pick_slot(self, rng):
+        return rng.choice(self.service_ids), rng.choice(self.dates)
+
+    def login(self, number):
+        client = Client(raise_request_exception=False)
+        client.force_login(self.customers[number])
+        return client
+
+    def run_user(self, number, client):
+        rng = random.Random(self.seed + number)
+        try:
+            with count_integrity_errors(self.result):
+                for _ in range(self.iterations):
+                    service, date = self.pick_slot(rng)
+                    self.timed("form", client.get, reverse("reservation"))
+                    response = self.timed(
+                        "check",
+                        client.get,
+                        reverse("check-reservation", args=[date.isoformat(), service]),
+                    )
+                    if not self.is_available(response):
+                        continue
+                    response = self.timed(
+                        "book",
+                        client.post,
+                        reverse("reservation"),
+                        self.booking_data(service, date),
+                        content_type=FORM_CONTENT_TYPE,
+                    )
+                    self.record_booking(response)
+                    if self.think_time:
+                        time.sleep(self.think_time)
+        finally:
+            connections.close_all()
+
+    async def run_async(self):
+        # Sync parts of ASGI handler run in one shared thread, so integrity errors
+        # are counted on connections of that thread.
+        stack = ExitStack()
+        await sync_to_async(stack.enter_context)(count_integrity_errors(self.result))
+        try:
+            await asyncio.gather(*(self.run_async_user(i) for i in range(self.users)))
+        finally:
+            await sync_to_async(stack.close)()
+            await sync_to_async(connections.close_all)()
+
+    async def run_async_user(self, number):
+        rng = random.Random(self.seed + number)
+        client = AsyncClient(raise_request_exception=False)
+        await sync_to_async(client.force_login)(self.customers[number])
+        for _ in range(self.iterations):
+            service, date = self.pick_slot(rng)
+            await self.atimed("form", client.get, reverse("reservation"))
+            response = await self.atimed(
+                "check",
+                client.get,
+                reverse("check-reservation", args=[date.isoformat(), service]),
+            )
+            if not self.is_available(response):
+                continue
+            response = await self.atimed(
+                "book",
+                client.post,
+                reverse("reservation"),
+                self.booking_data(service, date),
+                content_type=FORM_CONTENT_TYPE,
+            )
+            self.record_booking(response)
+            if self.think_time:
+                await asyncio.sleep(self.think_time)
+
+    def booking_data(self, service, date):
+        # Sent urlencoded like browser does; multipart bodies of AsyncClient
+        # can't be read by Django 4.0 on Python 3.11.
+        return urlencode(
+            {
+                "service_type": service,
+                "target_date": date.isoformat(),
+                "comments": "Test obciążeniowy",
+            }
+        )
+
+    def timed(self, step, method, *args, **kwargs):
+        start = time.perf_counter()
+        response = method(*args, **kwargs)
+        self.result.record(step, time.perf_counter() - start, response.status_code)
+        return response
+
+    async def atimed(self, step, method, *args, **kwargs):
+        start = time.perf_counter()
+        response = await method(*args, **kwargs)
+        self.result.record(step, time.perf_counter() - start, response.status_code)
+        return response
+
+    def is_available(self, response):
+        if response.status_code != 200:
+            self.result.count(self.result.outcomes, "check_failed")
+            return False
+        if not response.json()["is_available"]:
+            self.result.count(self.result.outcomes, "taken_on_check")
+            return False
+        return True
+
+    def record_booking(self, response):
+        if response.status_code == 302:
+            outcome = "booked"
+        elif response.status_code == 200:
+            outcome = "taken_on_submit"
+        else:
+            outcome = "failed"
+        self.result.count(self.result.outcomes, outcome)
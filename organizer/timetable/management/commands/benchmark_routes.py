@@ -0,0 +1,90 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from timetable.benchmarks import regressions, run_scale
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates test database, seeds it at every scale (number of reservations) "
+        "and measures p50/p95 latency and query count of every named route. "
+        "Fails when route is slower or runs more queries than stored baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scales", default="1000,100000,1000000", help="Comma separated numbers of reservations."
+        )
+        parser.add_argument("--repeat", type=int, default=20, help="Measured requests per route.")
+        parser.add_argument("--routes", nargs="*", help="Names of routes to measure.")
+        parser.add_argument(
+            "--baseline",
+            default=getattr(settings, "BENCHMARK_BASELINE", "benchmarks.json"),
+            help="JSON file with baseline results.",
+        )
+        parser.add_argument(
+            "--update-baseline", action="store_true", help="Store results as new baseline."
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=getattr(settings, "BENCHMARK_THRESHOLD", 0.25),
+            help="Allowed p95 growth over baseline as fraction, e.g. 0.25.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            scales = [int(scale) for scale in options["scales"].split(",")]
+        except ValueError:
+            raise CommandError("Scales must be comma separated integers.")
+        if options["repeat"] < 2:
+            raise CommandError("At least 2 measured requests are needed for percentiles.")
+        results = {}
+        setup_test_environment()
+        old_config = setup_databases(verbosity=options["verbosity"], interactive=False)
+        try:
+            client = Client()
+            for scale in scales:
+                self.stdout.write(f"Seeding {scale} reservations...")
+                results[str(scale)] = run_scale(
+                    client, scale, options["repeat"], options["routes"]
+                )
+                self.write_table(scale, results[str(scale)])
+        finally:
+            teardown_databases(old_config, verbosity=options["verbosity"])
+            teardown_test_environment()
+        baseline_path = Path(options["baseline"])
+        if options["update_baseline"] or not baseline_path.exists():
+            baseline = {}
+            if baseline_path.exists():
+                baseline = json.loads(baseline_path.read_text())
+            baseline.update(results)
+            baseline_path.write_text(json.dumps(baseline, indent=2, sort_keys=True))
+            self.stdout.write(f"Baseline stored in {baseline_path}.")
+            return
+        problems = regressions(
+            results, json.loads(baseline_path.read_text()), options["threshold"]
+        )
+        for problem in problems:
+            self.stderr.write(problem)
+        if problems:
+            raise CommandError(f"{len(problems)} routes regressed against baseline.")
+        self.stdout.write(self.style.SUCCESS("No route regressed against baseline."))
+
+    def write_table(self, scale, results):
+        self.stdout.write(f"{'route':<24} {'status':>6} {'p50 ms':>10} {'p95 ms':>10} {'queries':>8}")
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<24} {result['status']:>6} {result['p50']:>10} "
+                f"{result['p95']:>10} {result['queries']:>8}"
+            )
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test import Client
+from django.test.utils import override_settings
+
+from timetable.models import CustomUser
+from timetable.queryplans import reservation_urls, sequential_scans
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs EXPLAIN on queries of views reading reservations and fails "
+        "when any of them scans whole reservation table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threshold",
+            type=int,
+            default=getattr(settings, "QUERY_PLAN_SEQSCAN_THRESHOLD", 10000),
+            help="Sequential scans are allowed while table has no more rows than this.",
+        )
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        staff = CustomUser.objects.filter(is_superuser=True).order_by("id").first()
+        if staff is None:
+            raise CommandError("Superuser is needed to request staff views.")
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            with transaction.atomic(using=connection.alias):
+                client = Client()
+                client.force_login(staff)
+                problems = sequential_scans(
+                    client, reservation_urls(), connection, threshold=options["threshold"]
+                )
+                transaction.set_rollback(True, using=connection.alias)
+        for url, sql, plan in problems:
+            self.stderr.write(f"{url}\n{sql}\n" + "\n".join(plan) + "\n")
+        if problems:
+            raise CommandError(f"{len(problems)} queries scan whole reservation table.")
+        self.stdout.write(self.style.SUCCESS("No sequential scans of reservation table."))
@@ -0,0 +1,55 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from timetable.models import Reservation
+from timetable.synthetic import SyntheticDataGenerator, Volumes
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills database with deterministic synthetic customers, employees, teams, "
+        "services, reservations and comments. The same seed and start date always "
+        "give the same data. Volumes default to proportions of --reservations."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reservations", type=int, default=10000)
+        for name in ("customers", "employees", "teams", "services", "comments"):
+            parser.add_argument(f"--{name}", type=int)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--chunk-size", type=int, default=5000)
+        parser.add_argument("--days", type=int, default=730, help="Length of booked period.")
+        parser.add_argument(
+            "--start-date",
+            type=datetime.date.fromisoformat,
+            help="First booked day (YYYY-MM-DD), by default half of period before today.",
+        )
+        parser.add_argument("--password", default="synthetic", help="Password of every customer.")
+
+    def handle(self, *args, **options):
+        if Reservation.objects.exists():
+            raise CommandError("Generator needs empty reservation table to keep slots unique.")
+        volumes = Volumes.for_reservations(options["reservations"], options["days"])
+        for name in ("customers", "employees", "teams", "services", "comments"):
+            if options[name] is not None:
+                setattr(volumes, name, options[name])
+        generator = SyntheticDataGenerator(
+            seed=options["seed"],
+            chunk_size=options["chunk_size"],
+            start_date=options["start_date"],
+            days=options["days"],
+            password=options["password"],
+            log=self.stdout.write,
+        )
+        start = time.perf_counter()
+        try:
+            with transaction.atomic():
+                generator.generate(volumes)
+        except ValueError as error:
+            raise CommandError(error)
+        self.stdout.write(
+            self.style.SUCCESS(f"Generated data in {time.perf_counter() - start:.1f} s.")
+        )
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from timetable.importing import (
+    RejectsWriter,
+    ReservationImporter,
+    read_csv,
+    read_jsonl,
+)
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl}
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports reservations from CSV or JSON lines file with columns: customer (email), "
+        "service (id or name), target_date and optional finish_date (YYYY-MM-DD), "
+        "comments, is_accepted and teams (ids or names, separated with ';' in CSV). "
+        "Rows which can't be imported are written to rejects file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=sorted(READERS))
+        parser.add_argument("--rejects", help="Path of file for rejected rows.")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or path.rsplit(".", 1)[-1].lower()
+        if file_format not in READERS:
+            raise CommandError("Unknown file format, use --format csv or jsonl.")
+        rejects = RejectsWriter(options["rejects"], file_format)
+        importer = ReservationImporter(rejects, chunk_size=options["chunk_size"])
+        try:
+            with open(path, newline="", encoding="utf-8") as file:
+                importer.run(READERS[file_format](file))
+        finally:
+            rejects.close()
+        self.stdout.write(
+            f"Imported {importer.imported} reservations, rejected {importer.rejected}."
+        )
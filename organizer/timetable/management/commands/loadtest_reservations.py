@@ -0,0 +1,60 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from timetable.loadtest import ReservationLoadTest, cleanup
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs concurrent virtual users through reservation flow (form, date check, "
+        "booking) in-process against configured database and reports throughput, "
+        "latency percentiles, error rates and unique service_date violations. "
+        "Load test users and their reservations are deleted afterwards unless --keep "
+        "is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users.")
+        parser.add_argument("--iterations", type=int, default=10, help="Bookings tried by every user.")
+        parser.add_argument("--services", type=int, default=3, help="Number of contested services.")
+        parser.add_argument("--days", type=int, default=14, help="Number of contested days.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--think-time", type=float, default=0, help="Pause between bookings in seconds.")
+        parser.add_argument("--mode", choices=("wsgi", "asgi"), default="wsgi")
+        parser.add_argument("--keep", action="store_true", help="Keep load test users and booked reservations.")
+        parser.add_argument("--json", action="store_true", help="Print summary as JSON.")
+
+    def handle(self, *args, **options):
+        try:
+            load_test = ReservationLoadTest(
+                users=options["users"],
+                iterations=options["iterations"],
+                services=options["services"],
+                days=options["days"],
+                seed=options["seed"],
+                think_time=options["think_time"],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            summary = load_test.run(options["mode"]).summary()
+        if not options["keep"]:
+            cleanup()
+        if options["json"]:
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+        self.stdout.write(
+            f"{summary['requests']} requests in {summary['duration_s']} s: "
+            f"{summary['requests_per_s']} requests/s, {summary['bookings_per_s']} bookings/s"
+        )
+        self.stdout.write(f"Outcomes: {summary['outcomes']}")
+        self.stdout.write(f"Integrity errors: {summary['integrity_errors']}")
+        self.stdout.write(f"{'step':<8} {'requests':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for step, stats in summary["steps"].items():
+            self.stdout.write(
+                f"{step:<8} {stats['requests']:>9} {stats['p50_ms']:>9} {stats['p95_ms']:>9} "
+                f"{stats['p99_ms']:>9} {stats['error_rate']:>7.2%}"
+            )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from timetable.workload import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes weekly employee workload from accepted reservations. "
+        "Workload is kept up to date on every change, so this is only needed "
+        "after writing to the database around the application."
+    )
+
+    def handle(self, *args, **options):
+        rows = rebuild()
+        self.stdout.write(f"Rebuilt {rows} workload rows.")
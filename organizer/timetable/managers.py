@@ -1,8 +1,34 @@
+import datetime
+
+from django.conf import settings
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import UserManager as DjangoUserManager
+from django.db import models
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from timetable.caching import bump_version
+
 
+class TimestampedQuerySet(models.QuerySet):
+    """
+    QuerySet of model with `updated_at` field, which bulk UPDATE doesn't skip
+    the way it skips auto_now.
+    """
 
-class UserManager(DjangoUserManager):
+    def update(self, **kwargs):
+        kwargs.setdefault("updated_at", timezone.now())
+        return super().update(**kwargs)
+
+    def touch(self):
+        """
+        Marks all rows of queryset as modified now with single UPDATE.
+        """
+        return self.update()
+
+
+class UserManager(DjangoUserManager.from_queryset(TimestampedQuerySet)):
     def _create_user(self, email, password, **extra_fields):
         """
         Create and save a user with the given username, email, and password.
@@ -31,3 +57,87 @@ class UserManager(DjangoUserManager):
             raise ValueError("Superuser must have is_superuser=True.")
 
         return self._create_user(email, password, **extra_fields)
+
+
+class TeamQuerySet(TimestampedQuerySet):
+    def with_roster(self):
+        """
+        Prefetches team members ordered by surname and annotates every team with
+        member count and number of upcoming accepted reservations.
+        Counts come from correlated subqueries, so they don't multiply joined rows.
+        """
+        employee_model = self.model.employees.field.related_model
+        members = (
+            self.model.employees.through.objects.filter(team=OuterRef("pk"))
+            .order_by()
+            .values("team")
+            .annotate(count=Count("*"))
+            .values("count")
+        )
+        upcoming = (
+            self.model.reservation_set.through.objects.filter(
+                team=OuterRef("pk"),
+                reservation__is_accepted=True,
+                reservation__finish_date__gte=datetime.date.today(),
+            )
+            .order_by()
+            .values("team")
+            .annotate(count=Count("*"))
+            .values("count")
+        )
+        return self.annotate(
+            member_count=Coalesce(Subquery(members), 0),
+            upcoming_reservations=Coalesce(Subquery(upcoming), 0),
+        ).prefetch_related(
+            Prefetch(
+                "employees",
+                queryset=employee_model.objects.order_by("employee_surname", "id"),
+            )
+        )
+
+
+class ReservationQuerySet(TimestampedQuerySet):
+    def overlapping(self, start, finish):
+        """
+        Filters reservations sharing at least one day with span from start to finish.
+        Reservation lasts at most MAX_RESERVATION_DAYS, so lower bound of its start
+        is known and whole check is one range scan of (service_type, target_date,
+        finish_date) index instead of query per day.
+        """
+        max_days = getattr(settings, "MAX_RESERVATION_DAYS", 14)
+        return self.filter(
+            target_date__gt=start - datetime.timedelta(days=max_days),
+            target_date__lte=finish,
+            finish_date__gte=start,
+        )
+
+    def accept(self):
+        """
+        Accepts all pending reservations of queryset with single UPDATE.
+        Cache version moves after the write, as outside transaction it moves
+        at once and page cached in between would keep old rows.
+        """
+        updated = self.filter(is_accepted=False).update(is_accepted=True)
+        bump_version(self.model)
+        return updated
+
+    def assign_teams(self, teams):
+        """
+        Adds teams to every reservation of queryset with bulk insert into through table.
+        """
+        through = self.model.teams.through
+        team_model = self.model.teams.field.related_model
+        created = through.objects.bulk_create(
+            [
+                through(reservation_id=reservation_id, team_id=team.pk)
+                for reservation_id in self.values_list("pk", flat=True)
+                for team in teams
+            ],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+        self.touch()
+        team_model.objects.filter(pk__in=[team.pk for team in teams]).touch()
+        bump_version(self.model)
+        bump_version(team_model)
+        return created
@@ -0,0 +1,250 @@
+import asyncio
+import bisect
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.utils.decorators import sync_and_async_middleware
+
+from timetable.caching import cache_stats
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+MAX_RECORDED_QUERIES = 1000
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def lines(self, name, labels):
+        total = 0
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            total += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {total}'
+        yield f"{name}_sum{{{labels}}} {self.sum}"
+        yield f"{name}_count{{{labels}}} {total}"
+
+
+class ViewStats:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_time = 0.0
+
+
+class RequestMetrics:
+    """
+    Aggregates latency, number of queries and database time of requests
+    per URL name in current process.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = defaultdict(ViewStats)
+
+    def record(self, view_name, duration, queries, db_time):
+        with self.lock:
+            stats = self.views[view_name]
+            stats.latency.observe(duration)
+            stats.queries.observe(queries)
+            stats.db_time += db_time
+
+    def clear(self):
+        with self.lock:
+            self.views.clear()
+
+    def exposition(self):
+        """
+        Returns aggregates and response cache counters in Prometheus text format.
+        """
+        with self.lock:
+            views = sorted(self.views.items())
+            lines = [
+                "# HELP organizer_request_duration_seconds Request latency per URL name.",
+                "# TYPE organizer_request_duration_seconds histogram",
+            ]
+            for name, stats in views:
+                lines.extend(
+                    stats.latency.lines("organizer_request_duration_seconds", label(name))
+                )
+            lines += [
+                "# HELP organizer_request_queries SQL queries per request and URL name.",
+                "# TYPE organizer_request_queries histogram",
+            ]
+            for name, stats in views:
+                lines.extend(stats.queries.lines("organizer_request_queries", label(name)))
+            lines += [
+                "# HELP organizer_request_db_seconds_total Time spent in database per URL name.",
+                "# TYPE organizer_request_db_seconds_total counter",
+            ]
+            for name, stats in views:
+                lines.append(
+                    f"organizer_request_db_seconds_total{{{label(name)}}} {stats.db_time}"
+                )
+        cached = cache_stats.as_dict()
+        for kind in ("hits", "misses"):
+            lines += [
+                f"# HELP organizer_response_cache_{kind}_total Response cache {kind} per view.",
+                f"# TYPE organizer_response_cache_{kind}_total counter",
+            ]
+            for name, counts in cached.items():
+                lines.append(
+                    f"organizer_response_cache_{kind}_total{{{label(name)}}} {counts[kind]}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+def label(view_name):
+    escaped = view_name.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'view="{escaped}"'
+
+
+request_metrics = RequestMetrics()
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper counting queries and their time. Keeps SQL of first
+    MAX_RECORDED_QUERIES queries, so slow request can be logged.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.time += duration
+            if len(self.statements) < MAX_RECORDED_QUERIES:
+                self.statements.append((duration, sql, params))
+
+
+current_recorder = ContextVar("current_recorder", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Passes query to recorder of request being served. Context variable follows
+    request into threads running its sync code, unlike thread-local connections.
+    """
+    recorder = current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@sync_and_async_middleware
+class MetricsMiddleware:
+    """
+    Records metrics of every request under name of resolved URL. Requests slower
+    than METRICS_SLOW_REQUEST_SECONDS are logged with their SQL, sampled with
+    METRICS_SLOW_REQUEST_SAMPLE_RATE. Works in both sync and async middleware chains.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        token = current_recorder.set(recorder)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        return self.finish(request, response, recorder, start)
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        token = current_recorder.set(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        return self.finish(request, response, recorder, start)
+
+    def finish(self, request, response, recorder, start):
+        if response.streaming:
+            response.streaming_content = self.consume(
+                request, response.streaming_content, recorder, start
+            )
+        else:
+            self.record(request, recorder, start)
+        return response
+
+    def consume(self, request, content, recorder, start):
+        """
+        Streamed responses run their queries while content is read, so they are
+        recorded once content is consumed or response is closed.
+        """
+        chunks = iter(content)
+        try:
+            while True:
+                token = current_recorder.set(recorder)
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    return
+                finally:
+                    current_recorder.reset(token)
+                yield chunk
+        finally:
+            self.record(request, recorder, start)
+
+    def record(self, request, recorder, start):
+        duration = time.perf_counter() - start
+        match = request.resolver_match
+        view_name = (match.view_name if match else None) or "<unresolved>"
+        request_metrics.record(view_name, duration, recorder.count, recorder.time)
+        if duration >= getattr(settings, "METRICS_SLOW_REQUEST_SECONDS", 0.5):
+            if random.random() < getattr(settings, "METRICS_SLOW_REQUEST_SAMPLE_RATE", 0.1):
+                self.log_slow_request(request, view_name, duration, recorder)
+
+    def log_slow_request(self, request, view_name, duration, recorder):
+        statements = "\n".join(
+            f"  {query_time * 1000:.1f} ms: {sql} {params!r}"
+            for query_time, sql, params in recorder.statements
+        )
+        logger.warning(
+            "Slow request %s %s (%s) took %.3f s, %d queries in %.3f s:\n%s",
+            request.method,
+            request.get_full_path(),
+            view_name,
+            duration,
+            recorder.count,
+            recorder.time,
+            statements,
+        )
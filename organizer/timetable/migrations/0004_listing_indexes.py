@@ -0,0 +1,45 @@
+# Generated by Django 4.0.3 on 2026-10-18 17:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0003_alter_reservation_target_date'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['email'], name='customuser_email_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['employee_surname', 'id'], name='employee_surname_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['job', 'employee_surname', 'id'], name='employee_job_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['employee_surname'], name='employee_surname_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='services',
+            index=models.Index(fields=['service_name', 'id'], name='services_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='services',
+            index=models.Index(fields=['service_name'], name='services_name_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='team',
+            index=models.Index(fields=['team_name', 'id'], name='team_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='team',
+            index=models.Index(fields=['team_name'], name='team_name_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.0.3 on 2026-10-18 17:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0004_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['customer', 'is_accepted', 'target_date'], name='reservation_customer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['target_date', 'id'], name='reservation_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(condition=models.Q(('is_accepted', False)), fields=['target_date', 'id'], name='reservation_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.0.3 on 2026-10-18 17:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0005_reservation_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='services',
+            name='min_team_size',
+            field=models.PositiveSmallIntegerField(default=1, verbose_name='Minimalna liczba pracowników'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.0.3 on 2026-10-18 17:33
+
+import datetime
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0006_services_min_team_size'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurringReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField(validators=[django.core.validators.MinValueValidator(datetime.date.today)], verbose_name='Pierwszy termin')),
+                ('finish_date', models.DateField(blank=True, null=True, verbose_name='Ostatni termin')),
+                ('frequency', models.CharField(choices=[('weekly', 'Co tydzień'), ('monthly', 'Co miesiąc')], max_length=8, verbose_name='Powtarzaj')),
+                ('interval', models.PositiveSmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(12)], verbose_name='Co ile tygodni lub miesięcy')),
+                ('comments', models.TextField(blank=True, null=True, verbose_name='Uwagi')),
+                ('is_accepted', models.BooleanField(default=False, verbose_name='Zaakceptowano')),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Klient')),
+                ('service_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='timetable.services', verbose_name='Rodzaj usługi')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='recurringreservation',
+            index=models.Index(fields=['service_type', 'finish_date'], name='recurring_service_idx'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+from django.db import migrations, models
+
+EXCLUSION_CONSTRAINT = "reservation_service_no_overlap"
+
+
+def fill_finish_date(apps, schema_editor):
+    Reservation = apps.get_model("timetable", "Reservation")
+    Reservation.objects.using(schema_editor.connection.alias).update(
+        finish_date=models.F("target_date")
+    )
+
+
+def add_exclusion_constraint(apps, schema_editor):
+    """
+    On PostgreSQL no two reservations of one service may share a day, enforced by
+    exclusion constraint over date ranges. Its GiST index needs btree_gist for the
+    service column. Other databases rely on overlap check before insert.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    schema_editor.execute(
+        f"ALTER TABLE timetable_reservation ADD CONSTRAINT {EXCLUSION_CONSTRAINT} "
+        "EXCLUDE USING gist "
+        "(service_type_id WITH =, daterange(target_date, finish_date, '[]') WITH &&)"
+    )
+
+
+def drop_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        f"ALTER TABLE timetable_reservation DROP CONSTRAINT IF EXISTS {EXCLUSION_CONSTRAINT}"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("timetable", "0007_recurring_reservation"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reservation",
+            name="finish_date",
+            field=models.DateField(null=True, verbose_name="Termin zakończenia"),
+        ),
+        migrations.RunPython(fill_finish_date, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="reservation",
+            name="finish_date",
+            field=models.DateField(verbose_name="Termin zakończenia"),
+        ),
+        migrations.AddConstraint(
+            model_name="reservation",
+            constraint=models.CheckConstraint(
+                check=models.Q(finish_date__gte=models.F("target_date")),
+                name="reservation_finish_after_start",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                fields=["service_type", "target_date", "finish_date"],
+                name="reservation_service_span_idx",
+            ),
+        ),
+        migrations.RunPython(add_exclusion_constraint, drop_exclusion_constraint),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.3 on 2026-10-18 17:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0008_reservation_finish_date'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['target_date', 'finish_date'], name='reservation_span_idx'),
+        ),
+    ]
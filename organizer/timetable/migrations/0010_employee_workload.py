@@ -0,0 +1,54 @@
+# Generated by Django 4.0.3 on 2026-10-18 17:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models.functions import TruncWeek
+
+
+def fill_workload(apps, schema_editor):
+    Reservation = apps.get_model("timetable", "Reservation")
+    EmployeeWorkload = apps.get_model("timetable", "EmployeeWorkload")
+    alias = schema_editor.connection.alias
+    rows = (
+        Reservation.objects.using(alias)
+        .filter(is_accepted=True, teams__employees__isnull=False)
+        .annotate(week=TruncWeek("target_date"))
+        .order_by()
+        .values_list("teams__employees", "week")
+        .annotate(jobs=models.Count("id", distinct=True))
+    )
+    EmployeeWorkload.objects.using(alias).bulk_create(
+        (
+            EmployeeWorkload(employee_id=employee_id, week_start=week, jobs=jobs)
+            for employee_id, week, jobs in rows
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0009_reservation_span_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeWorkload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField(verbose_name='Początek tygodnia')),
+                ('jobs', models.PositiveIntegerField(default=0, verbose_name='Liczba zleceń')),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='timetable.employee', verbose_name='Pracownik')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='employeeworkload',
+            index=models.Index(fields=['week_start', 'employee'], name='workload_week_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='employeeworkload',
+            constraint=models.UniqueConstraint(fields=('employee', 'week_start'), name='unique employee_week'),
+        ),
+        migrations.RunPython(fill_workload, migrations.RunPython.noop),
+    ]
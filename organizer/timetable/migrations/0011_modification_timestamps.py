@@ -0,0 +1,51 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+TIMESTAMPED_MODELS = ("customuser", "employee", "team", "services", "reservation")
+
+
+def seed_change_marks(apps, schema_editor):
+    ModelChangeMark = apps.get_model("timetable", "ModelChangeMark")
+    now = django.utils.timezone.now()
+    ModelChangeMark.objects.using(schema_editor.connection.alias).bulk_create(
+        [
+            ModelChangeMark(model=f"timetable.{model}", changed_at=now)
+            for model in TIMESTAMPED_MODELS
+        ],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("timetable", "0010_employee_workload"),
+    ]
+
+    operations = [
+        *[
+            migrations.AddField(
+                model_name=model,
+                name="updated_at",
+                field=models.DateTimeField(
+                    auto_now=True,
+                    db_index=True,
+                    default=django.utils.timezone.now,
+                    verbose_name="Zmodyfikowano",
+                ),
+                preserve_default=False,
+            )
+            for model in TIMESTAMPED_MODELS
+        ],
+        migrations.CreateModel(
+            name="ModelChangeMark",
+            fields=[
+                (
+                    "model",
+                    models.CharField(max_length=100, primary_key=True, serialize=False),
+                ),
+                ("changed_at", models.DateTimeField(verbose_name="Zmodyfikowano")),
+            ],
+        ),
+        migrations.RunPython(seed_change_marks, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,19 @@
 import datetime
 
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
-from django.core.validators import MinValueValidator
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
-from timetable.managers import UserManager
+from timetable.managers import (
+    UserManager,
+    TeamQuerySet,
+    ReservationQuerySet,
+    TimestampedQuerySet,
+)
+from timetable.recurrence import FREQUENCIES, Recurrence
 
 
 # class User(models.Model):
@@ -39,6 +47,9 @@ class CustomUser(AbstractUser):
     postcode = models.CharField(
         max_length=6, blank=True, verbose_name=_("Kod pocztowy")
     )
+    updated_at = models.DateTimeField(
+        auto_now=True, db_index=True, verbose_name=_("Zmodyfikowano")
+    )
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
@@ -55,11 +66,14 @@ class CustomUser(AbstractUser):
     def get_absolute_url(self):
         return reverse("user-details", kwargs={"user_id": self.pk})
 
-
-# class TargetDate(models.Model):
-#     start_date = models.DateField()
-#     finish_date = models.DateField()
-#     periodically = models.BooleanField(default=False)
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(
+                fields=["email"],
+                opclasses=["varchar_pattern_ops"],
+                name="customuser_email_prefix_idx",
+            ),
+        ]
 
 
 class Employee(models.Model):
@@ -67,6 +81,11 @@ class Employee(models.Model):
     employee_name = models.CharField(max_length=64, verbose_name=_("Imię"))
     employee_surname = models.CharField(max_length=64, verbose_name=_("Nazwisko"))
     job = models.CharField(max_length=8, choices=JOBS, verbose_name=_("Funkcja"))
+    updated_at = models.DateTimeField(
+        auto_now=True, db_index=True, verbose_name=_("Zmodyfikowano")
+    )
+
+    objects = TimestampedQuerySet.as_manager()
 
     @property
     def name(self):
@@ -78,10 +97,26 @@ class Employee(models.Model):
     def get_absolute_url(self):
         return reverse("employee-details", kwargs={"employee_id": self.pk})
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["employee_surname", "id"], name="employee_surname_idx"),
+            models.Index(fields=["job", "employee_surname", "id"], name="employee_job_idx"),
+            models.Index(
+                fields=["employee_surname"],
+                opclasses=["varchar_pattern_ops"],
+                name="employee_surname_prefix_idx",
+            ),
+        ]
+
 
 class Team(models.Model):
     team_name = models.CharField(max_length=64, verbose_name=_("Nazwa zespołu"))
     employees = models.ManyToManyField(Employee, verbose_name=_("Pracownicy"))
+    updated_at = models.DateTimeField(
+        auto_now=True, db_index=True, verbose_name=_("Zmodyfikowano")
+    )
+
+    objects = TeamQuerySet.as_manager()
 
     def __str__(self):
         return self.team_name
@@ -89,13 +124,52 @@ class Team(models.Model):
     def get_absolute_url(self):
         return reverse("team-details", kwargs={"team_id": self.pk})
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["team_name", "id"], name="team_name_idx"),
+            models.Index(
+                fields=["team_name"],
+                opclasses=["varchar_pattern_ops"],
+                name="team_name_prefix_idx",
+            ),
+        ]
+
 
 class Services(models.Model):
     service_name = models.CharField(max_length=128, verbose_name=_("Nazwa usługi"))
+    min_team_size = models.PositiveSmallIntegerField(
+        default=1, verbose_name=_("Minimalna liczba pracowników")
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True, db_index=True, verbose_name=_("Zmodyfikowano")
+    )
+
+    objects = TimestampedQuerySet.as_manager()
 
     def __str__(self):
         return self.service_name
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["service_name", "id"], name="services_name_idx"),
+            models.Index(
+                fields=["service_name"],
+                opclasses=["varchar_pattern_ops"],
+                name="services_name_prefix_idx",
+            ),
+        ]
+
+
+def date_span(start, finish):
+    """
+    Returns list of consecutive days from start to finish (inclusive).
+    """
+    return [start + datetime.timedelta(days=i) for i in range((finish - start).days + 1)]
+
+
+def max_reservation_days():
+    return getattr(settings, "MAX_RESERVATION_DAYS", 14)
+
 
 class Reservation(models.Model):
     customer = models.ForeignKey(
@@ -106,15 +180,46 @@ class Reservation(models.Model):
         verbose_name=_("Termin wykonania"),
         validators=[MinValueValidator(datetime.date.today)],
     )
+    finish_date = models.DateField(verbose_name=_("Termin zakończenia"))
     comments = models.TextField(null=True, verbose_name=_("Uwagi"))
     is_accepted = models.BooleanField(default=False, verbose_name=_("Zaakceptowano"))
     service_type = models.ForeignKey(
         Services, on_delete=models.CASCADE, verbose_name=_("Rodzaj usługi")
     )
+    updated_at = models.DateTimeField(
+        auto_now=True, db_index=True, verbose_name=_("Zmodyfikowano")
+    )
+
+    objects = ReservationQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.customer} {self.target_date} {self.service_type}"
 
+    def clean(self):
+        if self.finish_date is None or self.target_date is None:
+            return
+        if self.finish_date < self.target_date:
+            raise ValidationError(
+                {"finish_date": _("Termin zakończenia jest wcześniejszy niż rozpoczęcia")}
+            )
+        if len(self.dates) > max_reservation_days():
+            raise ValidationError(
+                {
+                    "finish_date": _("Rezerwacja może trwać najwyżej %(days)s dni")
+                    % {"days": max_reservation_days()}
+                }
+            )
+
+    def save(self, *args, **kwargs):
+        # Single day reservations don't need finish date to be given.
+        if self.finish_date is None:
+            self.finish_date = self.target_date
+        super().save(*args, **kwargs)
+
+    @property
+    def dates(self):
+        return date_span(self.target_date, self.finish_date or self.target_date)
+
     def get_absolute_url(self):
         return reverse("reservation-details", kwargs={"reservation_id": self.pk})
 
@@ -123,10 +228,124 @@ class Reservation(models.Model):
         constraints = [
             models.UniqueConstraint(
                 fields=["target_date", "service_type"], name="unique service_date"
-            )
+            ),
+            models.CheckConstraint(
+                check=models.Q(finish_date__gte=models.F("target_date")),
+                name="reservation_finish_after_start",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["customer", "is_accepted", "target_date"],
+                name="reservation_customer_idx",
+            ),
+            models.Index(fields=["target_date", "id"], name="reservation_date_idx"),
+            models.Index(
+                fields=["target_date", "id"],
+                condition=models.Q(is_accepted=False),
+                name="reservation_pending_idx",
+            ),
+            models.Index(
+                fields=["service_type", "target_date", "finish_date"],
+                name="reservation_service_span_idx",
+            ),
+            # Spans of any service, walked to teams table when looking for team clashes.
+            models.Index(
+                fields=["target_date", "finish_date"], name="reservation_span_idx"
+            ),
         ]
 
 
+class RecurringReservation(models.Model):
+    """
+    Reservation repeating every `interval` weeks or months. Only the rule is stored,
+    occurrences are computed for the dates being viewed (see timetable.recurrence).
+    """
+
+    customer = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, verbose_name=_("Klient")
+    )
+    service_type = models.ForeignKey(
+        Services, on_delete=models.CASCADE, verbose_name=_("Rodzaj usługi")
+    )
+    start_date = models.DateField(
+        verbose_name=_("Pierwszy termin"),
+        validators=[MinValueValidator(datetime.date.today)],
+    )
+    finish_date = models.DateField(
+        null=True, blank=True, verbose_name=_("Ostatni termin")
+    )
+    frequency = models.CharField(
+        max_length=8, choices=FREQUENCIES, verbose_name=_("Powtarzaj")
+    )
+    interval = models.PositiveSmallIntegerField(
+        default=1,
+        validators=[MinValueValidator(1), MaxValueValidator(12)],
+        verbose_name=_("Co ile tygodni lub miesięcy"),
+    )
+    comments = models.TextField(null=True, blank=True, verbose_name=_("Uwagi"))
+    is_accepted = models.BooleanField(default=False, verbose_name=_("Zaakceptowano"))
+
+    def __str__(self):
+        return f"{self.customer} {self.get_frequency_display()} {self.service_type}"
+
+    @property
+    def recurrence(self):
+        return Recurrence(self.start_date, self.finish_date, self.frequency, self.interval)
+
+    def occurrences(self, start, end):
+        return self.recurrence.occurrences(start, end)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["service_type", "finish_date"], name="recurring_service_idx"
+            ),
+        ]
+
+
+class EmployeeWorkload(models.Model):
+    """
+    Number of accepted reservations employee works on, per ISO week of their start.
+    Rows are recomputed for affected weeks whenever reservations, their teams
+    or team members change (see timetable.workload), so reports don't join
+    reservations, teams and employees over whole history.
+    """
+
+    employee = models.ForeignKey(
+        Employee, on_delete=models.CASCADE, verbose_name=_("Pracownik")
+    )
+    week_start = models.DateField(verbose_name=_("Początek tygodnia"))
+    jobs = models.PositiveIntegerField(default=0, verbose_name=_("Liczba zleceń"))
+
+    def __str__(self):
+        return f"{self.employee} {self.week_start}: {self.jobs}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["employee", "week_start"], name="unique employee_week"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["week_start", "employee"], name="workload_week_idx"),
+        ]
+
+
+class ModelChangeMark(models.Model):
+    """
+    Time of last deletion of model rows, moved forward after commit deleting any
+    of them (see timetable.caching). Together with latest `updated_at` of remaining
+    rows it tells when list pages changed without scanning them.
+    """
+
+    model = models.CharField(max_length=100, primary_key=True)
+    changed_at = models.DateTimeField(verbose_name=_("Zmodyfikowano"))
+
+    def __str__(self):
+        return f"{self.model}: {self.changed_at}"
+
+
 class Comments(models.Model):
     subject = models.CharField(max_length=128)
     content = models.TextField()
@@ -0,0 +1,145 @@
+import base64
+import binascii
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+class KeysetPage:
+    """
+    Single page of objects returned by KeysetPaginator.
+    """
+
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Paginates queryset with cursor pointing at last object of previous page instead of OFFSET.
+    Every page is fetched with single query filtering on ordering fields,
+    so its cost doesn't depend on how far into the table the page is.
+    Ordering has to be unique, so it should end with primary key.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset.order_by(*ordering)
+        self.ordering = ordering
+        self.per_page = per_page
+
+    def get_page(self, cursor=None):
+        queryset = self.queryset
+        values = self.decode_cursor(cursor)
+        if values is not None:
+            try:
+                queryset = queryset.filter(self.after(values))
+            except (ValidationError, ValueError, TypeError):
+                pass
+        objects = list(queryset[: self.per_page + 1])
+        next_cursor = None
+        if len(objects) > self.per_page:
+            objects = objects[: self.per_page]
+            next_cursor = self.encode_cursor(objects[-1])
+        return KeysetPage(objects, next_cursor)
+
+    def after(self, values):
+        """
+        Builds condition selecting rows placed after given ordering values.
+        """
+        conditions = []
+        for position, field in enumerate(self.ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition = {
+                prior.lstrip("-"): value
+                for prior, value in zip(self.ordering[:position], values)
+            }
+            condition[f"{name}__{lookup}"] = values[position]
+            conditions.append(Q(**condition))
+        # Redundant bound on leading field lets database start index scan at cursor.
+        first = self.ordering[0]
+        lookup = "lte" if first.startswith("-") else "gte"
+        return Q(**{f"{first.lstrip('-')}__{lookup}": values[0]}) & reduce(
+            or_, conditions
+        )
+
+    def encode_cursor(self, obj):
+        values = [getattr(obj, field.lstrip("-")) for field in self.ordering]
+        data = json.dumps(values, cls=DjangoJSONEncoder).encode()
+        return base64.urlsafe_b64encode(data).decode()
+
+    def decode_cursor(self, cursor):
+        """
+        Returns ordering values stored in cursor or None when cursor is missing or malformed.
+        """
+        if not cursor:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (binascii.Error, ValueError):
+            return None
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            return None
+        return values
+
+
+class KeysetListMixin:
+    """
+    Adds filtering and cursor pagination to TemplateView based listings.
+    Filters come from `filter_form_class` (see timetable.forms.ListingFilterForm),
+    page is put into context under `context_object_name`.
+    """
+
+    model = None
+    queryset = None
+    ordering = ("id",)
+    paginate_by = 25
+    filter_form_class = None
+    context_object_name = "object_list"
+
+    def get_queryset(self):
+        """
+        Returns `queryset` or all objects of `model`, like MultipleObjectMixin does.
+        """
+        if self.queryset is not None:
+            return self.queryset.all()
+        if self.model is not None:
+            return self.model._default_manager.all()
+        raise ImproperlyConfigured(
+            f"{type(self).__name__} is missing a QuerySet. Define "
+            f"{type(self).__name__}.model, {type(self).__name__}.queryset, or override "
+            f"{type(self).__name__}.get_queryset()."
+        )
+
+    def get_context_data(self):
+        form = self.filter_form_class(self.request.GET)
+        queryset = self.get_queryset()
+        page_size = self.paginate_by
+        if form.is_valid():
+            queryset = form.filter(queryset)
+            page_size = form.cleaned_data["page_size"] or page_size
+        else:
+            queryset = queryset.none()
+        paginator = KeysetPaginator(queryset, self.ordering, page_size)
+        page = paginator.get_page(self.request.GET.get("cursor"))
+        next_query = None
+        if page.has_next:
+            query = self.request.GET.copy()
+            query["cursor"] = page.next_cursor
+            next_query = query.urlencode()
+        return {"form": form, self.context_object_name: page, "next_query": next_query}
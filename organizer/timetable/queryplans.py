@@ -0,0 +1,118 @@
+import re
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.urls import reverse
+
+from timetable.models import CustomUser, Reservation, Services, Team
+
+RESERVATION_TABLE = Reservation._meta.db_table
+
+
+@contextmanager
+def capture_statements(connection):
+    """
+    Collects (sql, params) of every statement executed on connection inside the block.
+    """
+    statements = []
+
+    def wrapper(execute, sql, params, many, context):
+        statements.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield statements
+
+
+def explain(connection, sql, params):
+    """
+    Returns query plan lines. On PostgreSQL sequential scans are disabled while planning,
+    so plan contains Seq Scan only when no index can serve the query at all.
+    """
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute(f"EXPLAIN {sql}", params)
+            return [row[0] for row in cursor.fetchall()]
+        if connection.vendor == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return [row[-1] for row in cursor.fetchall()]
+    return []
+
+
+def table_names(sql, table):
+    """
+    Returns table name together with aliases it has in sql, e.g. U0 in subqueries.
+    """
+    aliases = re.findall(rf'"{table}"\s+(?:AS\s+)?"?([A-Z]\d+)"?\b', sql)
+    return {table, *aliases}
+
+
+def is_sequential_scan(line, names):
+    for name in names:
+        if re.search(rf"Seq Scan on {name}\b", line):
+            return True
+        if re.match(rf"\s*SCAN {name}(?: AS \w+)?$", line):
+            return True
+    return False
+
+
+def sequential_scans(client, urls, connection, table=RESERVATION_TABLE, threshold=0):
+    """
+    Requests every url and runs EXPLAIN on each SELECT touching table.
+    Returns list of (url, sql, plan) of queries scanning whole table.
+    Nothing is reported while table has no more than threshold rows.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(table)}")
+        if cursor.fetchone()[0] <= threshold:
+            return []
+    problems = []
+    for url in urls:
+        with capture_statements(connection) as statements:
+            response = client.get(url)
+            if response.streaming:
+                b"".join(response.streaming_content)
+        for sql, params in statements:
+            if not sql.lstrip().upper().startswith("SELECT") or table not in sql:
+                continue
+            plan = explain(connection, sql, params)
+            names = table_names(sql, table)
+            if any(is_sequential_scan(line, names) for line in plan):
+                problems.append((url, sql, plan))
+    return problems
+
+
+def reservation_urls():
+    """
+    Returns urls of views reading reservations, built for sample objects from database.
+    """
+    urls = [
+        reverse("all-reservations"),
+        reverse("all-reservations") + "?status=pending",
+        reverse("all-reservations") + "?status=accepted",
+    ]
+    reservation = Reservation.objects.order_by("id").first()
+    if reservation is not None:
+        date = reservation.target_date.isoformat()
+        urls += [
+            reverse("all-reservations") + f"?date_from={date}&date_to={date}",
+            reverse("user-reservations", kwargs={"user_id": reservation.customer_id}),
+            reverse("reservation-export") + f"?date_from={date}&date_to={date}",
+            reverse("reservation-calendar")
+            + f"?month={reservation.target_date:%Y-%m}",
+            reverse("team-clashes") + f"?start={date}&end={date}",
+        ]
+    customer = CustomUser.objects.order_by("id").first()
+    if customer is not None:
+        urls.append(reverse("user-reservations", kwargs={"user_id": customer.id}))
+    team = Team.objects.order_by("id").first()
+    if team is not None:
+        urls += [
+            reverse("all-teams"),
+            reverse("team-details", kwargs={"team_id": team.id}),
+        ]
+    service = Services.objects.order_by("id").first()
+    if service is not None:
+        urls.append(reverse("service-availability", kwargs={"service": service.id}))
+    return urls
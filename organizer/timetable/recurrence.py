@@ -0,0 +1,105 @@
+import calendar
+import datetime
+import math
+from typing import NamedTuple, Optional
+
+WEEKLY = "weekly"
+MONTHLY = "monthly"
+FREQUENCIES = ((WEEKLY, "Co tydzień"), (MONTHLY, "Co miesiąc"))
+
+# Gregorian calendar repeats itself, weekdays included, every 400 years.
+CALENDAR_CYCLE_MONTHS = 4800
+
+
+def add_months(date, months, day):
+    """
+    Returns date `months` after given one on given day of month,
+    moved to last day of shorter months.
+    """
+    month_index = date.year * 12 + date.month - 1 + months
+    year, month = divmod(month_index, 12)
+    month += 1
+    return datetime.date(year, month, min(day, calendar.monthrange(year, month)[1]))
+
+
+def months_between(start, end):
+    return (end.year - start.year) * 12 + end.month - start.month
+
+
+class Recurrence(NamedTuple):
+    """
+    Rule of dates repeating every `interval` weeks or months from `start`
+    until `finish` (inclusive, None for no end). Dates are computed on demand,
+    so rule of any length costs the same to store and check.
+    """
+
+    start: datetime.date
+    finish: Optional[datetime.date]
+    frequency: str
+    interval: int = 1
+
+    def in_range(self, date):
+        return self.start <= date and (self.finish is None or date <= self.finish)
+
+    def occurs_on(self, date):
+        if not self.in_range(date):
+            return False
+        if self.frequency == WEEKLY:
+            return (date - self.start).days % (7 * self.interval) == 0
+        months = months_between(self.start, date)
+        return (
+            months % self.interval == 0
+            and add_months(self.start, months, self.start.day) == date
+        )
+
+    def occurrences(self, start, end):
+        """
+        Yields dates of rule between start and end (inclusive) in order.
+        """
+        start = max(start, self.start)
+        if self.finish is not None:
+            end = min(end, self.finish)
+        if start > end:
+            return
+        if self.frequency == WEEKLY:
+            step = 7 * self.interval
+            date = self.start + datetime.timedelta(
+                days=math.ceil((start - self.start).days / step) * step
+            )
+            while date <= end:
+                yield date
+                date += datetime.timedelta(days=step)
+            return
+        count = months_between(self.start, start) // self.interval
+        last_count = months_between(self.start, end) // self.interval
+        while count <= last_count:
+            date = add_months(self.start, count * self.interval, self.start.day)
+            if start <= date <= end:
+                yield date
+            count += 1
+
+    def first_common_date(self, other):
+        """
+        Returns first date on which both rules occur or None. Dates of two rules
+        repeat together within their common period, so only one period is searched.
+        """
+        start = max(self.start, other.start)
+        rules = (self, other)
+        if all(rule.frequency == WEEKLY for rule in rules):
+            cycle_days = math.lcm(*(7 * rule.interval for rule in rules))
+        else:
+            months = [rule.interval for rule in rules if rule.frequency == MONTHLY]
+            cycle_days = math.lcm(CALENDAR_CYCLE_MONTHS, *months) * 31
+        cycle_days = min(cycle_days, (datetime.date.max - start).days)
+        end = min(
+            [rule.finish for rule in rules if rule.finish is not None]
+            + [start + datetime.timedelta(days=cycle_days)]
+        )
+        sparser, denser = sorted((self, other), key=lambda rule: rule.density())
+        for date in sparser.occurrences(start, end):
+            if denser.occurs_on(date):
+                return date
+        return None
+
+    def density(self):
+        return 1 / (7 * self.interval if self.frequency == WEEKLY else 30 * self.interval)
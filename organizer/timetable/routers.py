@@ -0,0 +1,115 @@
+import asyncio
+import time
+
+from asgiref.local import Local
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.decorators import sync_and_async_middleware
+
+PIN_COOKIE = "primary_pin"
+
+_state = Local()
+
+
+def replica_alias():
+    alias = getattr(settings, "REPLICA_DATABASE", None)
+    return alias if alias in settings.DATABASES else None
+
+
+def pin_seconds():
+    return getattr(settings, "REPLICA_PIN_SECONDS", 10)
+
+
+def reset_state():
+    _state.use_replica = False
+    _state.written = False
+
+
+def reading_from_replica():
+    return getattr(_state, "use_replica", False) and not getattr(_state, "written", False)
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends reads to replica database (REPLICA_DATABASE setting) only while
+    ReplicaPinMiddleware serves view marked with `replica_reads = True`.
+    Writes, reads inside transactions, sessions and every read after write
+    in the same request go to primary database.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = replica_alias()
+        if alias is None or not reading_from_replica():
+            return DEFAULT_DB_ALIAS
+        if model._meta.app_label == "sessions":
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        _state.written = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+@sync_and_async_middleware
+class ReplicaPinMiddleware:
+    """
+    Lets router read from replica in GET and HEAD requests of views marked with
+    `replica_reads = True`. After request that wrote to database, cookie pins
+    client to primary for REPLICA_PIN_SECONDS, so it reads its own writes
+    while replica catches up. Works in both sync and async middleware chains.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Handler awaits middleware and its view hook directly only when
+            # they look like coroutine functions.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        reset_state()
+        try:
+            return self.pin(self.get_response(request))
+        finally:
+            reset_state()
+
+    async def __acall__(self, request):
+        reset_state()
+        try:
+            return self.pin(await self.get_response(request))
+        finally:
+            reset_state()
+
+    def pin(self, response):
+        if _state.written:
+            response.set_cookie(
+                PIN_COOKIE, str(int(time.time())), max_age=pin_seconds(), httponly=True
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, "view_class", None)
+        _state.use_replica = (
+            request.method in ("GET", "HEAD")
+            and getattr(view_class, "replica_reads", False)
+            and not self.is_pinned(request)
+        )
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        self.process_view(request, view_func, view_args, view_kwargs)
+
+    def is_pinned(self, request):
+        try:
+            written_at = int(request.COOKIES.get(PIN_COOKIE, 0))
+        except ValueError:
+            return False
+        return time.time() - written_at < pin_seconds()
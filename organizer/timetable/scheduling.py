@@ -0,0 +1,138 @@
+import datetime
+import heapq
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count
+
+from timetable import workload
+from timetable.caching import bump_version
+from timetable.models import Reservation, Team, date_span, max_reservation_days
+
+ReservationTeam = Reservation.teams.through
+BATCH_SIZE = 1000
+
+
+class SchedulePlan:
+    """
+    Result of scheduling: list of (reservation, team) assignments
+    and reservations no free team was big enough for.
+    """
+
+    def __init__(self, assignments, unassigned):
+        self.assignments = assignments
+        self.unassigned = unassigned
+
+    def __len__(self):
+        return len(self.assignments)
+
+
+def match_teams(reservations, teams):
+    """
+    Assigns at most one team to every reservation of single day or single span.
+    Team fits reservation when it has at least `min_team_size` members of reserved service.
+    Fitting teams of reservations form nested sets, so handling the most demanding
+    reservations first while any fitting team fits all remaining ones yields maximum matching.
+    Smallest fitting team is used, to keep bigger teams for bigger jobs.
+    """
+    teams = sorted(teams, key=lambda team: (team.member_count, team.id))
+    reservations = sorted(
+        reservations, key=lambda r: (-r.service_type.min_team_size, r.target_date, r.id)
+    )
+    available = []
+    next_team = len(teams) - 1
+    assignments, unassigned = [], []
+    for reservation in reservations:
+        required = reservation.service_type.min_team_size
+        while next_team >= 0 and teams[next_team].member_count >= required:
+            team = teams[next_team]
+            heapq.heappush(available, (team.member_count, team.id, team))
+            next_team -= 1
+        if available:
+            assignments.append((reservation, heapq.heappop(available)[2]))
+        else:
+            unassigned.append(reservation)
+    return assignments, unassigned
+
+
+def plan_schedule(date_from, date_to, lock=False):
+    """
+    Plans team assignments for pending reservations without teams starting between
+    given dates. Team takes at most one job per day, including jobs it's already
+    assigned to, so multi-day reservation needs team free on every day of its span.
+    Reads everything with three queries and matches teams in memory span by span.
+    """
+    reservations = (
+        Reservation.objects.filter(
+            is_accepted=False,
+            teams__isnull=True,
+            target_date__range=(date_from, date_to),
+        )
+        .select_related("customer", "service_type")
+        .order_by("target_date", "id")
+    )
+    if lock:
+        reservations = reservations.select_for_update(of=("self",))
+    teams = list(Team.objects.annotate(member_count=Count("employees")))
+    # Planned spans start by date_to, so jobs overlapping them end before last_day.
+    max_days = datetime.timedelta(days=max_reservation_days())
+    last_day = date_to + max_days
+    busy = defaultdict(set)
+    for team_id, start, finish in ReservationTeam.objects.filter(
+        reservation__target_date__gt=date_from - max_days,
+        reservation__target_date__lt=last_day,
+        reservation__finish_date__gte=date_from,
+    ).values_list("team_id", "reservation__target_date", "reservation__finish_date"):
+        for date in date_span(start, finish):
+            busy[date].add(team_id)
+    by_span = defaultdict(list)
+    for reservation in reservations:
+        by_span[(reservation.target_date, reservation.finish_date)].append(reservation)
+    assignments, unassigned = [], []
+    for (start, finish), span_reservations in sorted(by_span.items()):
+        dates = date_span(start, finish)
+        free_teams = [
+            team for team in teams if not any(team.id in busy[date] for date in dates)
+        ]
+        span_assignments, span_unassigned = match_teams(span_reservations, free_teams)
+        for reservation, team in span_assignments:
+            for date in dates:
+                busy[date].add(team.id)
+        assignments += span_assignments
+        unassigned += span_unassigned
+    return SchedulePlan(assignments, unassigned)
+
+
+def commit_schedule(date_from, date_to, accept=True):
+    """
+    Plans schedule again inside transaction and saves it with bulk inserts.
+    Returns committed plan.
+    """
+    with transaction.atomic():
+        plan = plan_schedule(date_from, date_to, lock=True)
+        ReservationTeam.objects.bulk_create(
+            [
+                ReservationTeam(reservation_id=reservation.id, team_id=team.id)
+                for reservation, team in plan.assignments
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        bump_version(Reservation)
+        bump_version(Team)
+        # Planned reservations are pending, so accepting them also updates timestamps.
+        ids = [reservation.id for reservation, team in plan.assignments]
+        for start in range(0, len(ids), BATCH_SIZE):
+            batch = Reservation.objects.filter(pk__in=ids[start : start + BATCH_SIZE])
+            if accept:
+                batch.accept()
+            else:
+                batch.touch()
+        Team.objects.filter(
+            pk__in={team.id for reservation, team in plan.assignments}
+        ).touch()
+        if accept:
+            workload.refresh_teams(
+                {team.id for reservation, team in plan.assignments},
+                [reservation.target_date for reservation, team in plan.assignments],
+            )
+    return plan
@@ -0,0 +1,205 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_init,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from timetable import workload
+from timetable.availability import availability_index
+from timetable.backends import forget_unknown_email
+from timetable.caching import bump_version, mark_deleted
+from timetable.models import (
+    CustomUser,
+    Employee,
+    RecurringReservation,
+    Reservation,
+    Services,
+    Team,
+)
+
+VERSIONED_MODELS = (CustomUser, Employee, Team, Services, Reservation)
+
+
+def reservation_slot(reservation):
+    """
+    Returns (service id, start, finish) of reservation without loading deferred fields.
+    """
+    return (
+        reservation.__dict__.get("service_type_id"),
+        reservation.__dict__.get("target_date"),
+        reservation.__dict__.get("finish_date"),
+    )
+
+
+def invalidate_slots(*slots):
+    for service_id in {slot[0] for slot in slots if slot is not None}:
+        if service_id is not None:
+            availability_index.invalidate(service_id)
+
+
+@receiver(post_init, sender=Reservation)
+def remember_reservation_slot(sender, instance, **kwargs):
+    instance._availability_slot = reservation_slot(instance)
+
+
+@receiver(post_save, sender=Reservation)
+def update_availability_on_save(sender, instance, created, **kwargs):
+    old_slot = None if created else instance._availability_slot
+    new_slot = reservation_slot(instance)
+    if old_slot != new_slot:
+        transaction.on_commit(partial(invalidate_slots, old_slot, new_slot))
+    instance._availability_slot = new_slot
+
+
+@receiver(post_delete, sender=Reservation)
+def update_availability_on_delete(sender, instance, **kwargs):
+    transaction.on_commit(partial(invalidate_slots, reservation_slot(instance)))
+
+
+@receiver(post_init, sender=RecurringReservation)
+def remember_rule_service(sender, instance, **kwargs):
+    instance._availability_service = instance.__dict__.get("service_type_id")
+
+
+@receiver(post_save, sender=RecurringReservation)
+@receiver(post_delete, sender=RecurringReservation)
+def invalidate_availability_rules(sender, instance, **kwargs):
+    for service_id in {instance._availability_service, instance.service_type_id}:
+        if service_id is not None:
+            transaction.on_commit(partial(availability_index.invalidate_rules, service_id))
+    instance._availability_service = instance.service_type_id
+
+
+@receiver(post_init, sender=Reservation)
+def remember_reservation_workload(sender, instance, **kwargs):
+    instance._workload_state = (
+        instance.__dict__.get("is_accepted"),
+        instance.__dict__.get("target_date"),
+    )
+
+
+# Workload handlers read affected employees and dates right away, as later changes
+# in the same transaction may remove them, and recompute workload on commit.
+
+
+def refresh_workload_on_commit(employee_ids, dates):
+    transaction.on_commit(partial(workload.refresh, employee_ids, dates))
+
+
+@receiver(post_save, sender=Reservation)
+def refresh_workload_on_save(sender, instance, created, **kwargs):
+    # New reservation has no teams yet, they are counted when added.
+    old_state = instance._workload_state
+    instance._workload_state = (instance.is_accepted, instance.target_date)
+    if not created and old_state != instance._workload_state:
+        refresh_workload_on_commit(
+            workload.reservation_members([instance.pk]),
+            [old_state[1], instance.target_date],
+        )
+
+
+@receiver(pre_delete, sender=Reservation)
+def refresh_workload_on_delete(sender, instance, **kwargs):
+    refresh_workload_on_commit(
+        workload.reservation_members([instance.pk]), [instance.target_date]
+    )
+
+
+@receiver(m2m_changed, sender=Reservation.teams.through)
+def refresh_workload_on_teams_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if reverse:
+        members = workload.team_members([instance.pk])
+        if action == "pre_clear":
+            dates = workload.team_dates([instance.pk])
+        else:
+            dates = workload.reservation_dates(pk_set)
+        refresh_workload_on_commit(members, dates)
+    else:
+        if action == "pre_clear":
+            pk_set = instance.teams.values_list("pk", flat=True)
+        refresh_workload_on_commit(workload.team_members(pk_set), [instance.target_date])
+
+
+@receiver(m2m_changed, sender=Team.employees.through)
+def refresh_workload_on_members_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if reverse:
+        if action == "pre_clear":
+            pk_set = instance.team_set.values_list("pk", flat=True)
+        refresh_workload_on_commit([instance.pk], workload.team_dates(pk_set))
+    else:
+        if action == "pre_clear":
+            pk_set = workload.team_members([instance.pk])
+        refresh_workload_on_commit(pk_set, workload.team_dates([instance.pk]))
+
+
+@receiver(pre_delete, sender=Team)
+def refresh_workload_on_team_delete(sender, instance, **kwargs):
+    refresh_workload_on_commit(
+        workload.team_members([instance.pk]), workload.team_dates([instance.pk])
+    )
+
+
+@receiver(post_save, sender=CustomUser)
+def forget_unknown_login_email(sender, instance, **kwargs):
+    transaction.on_commit(partial(forget_unknown_email, instance.email))
+
+
+def bump_saved_model_version(sender, update_fields=None, **kwargs):
+    # Logging in only updates last_login, which no cached page shows.
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    bump_version(sender)
+
+
+def bump_deleted_model_version(sender, **kwargs):
+    bump_version(sender)
+    mark_deleted(sender)
+
+
+def bump_related_versions(sender, action, instance, model, **kwargs):
+    if action.startswith("post_"):
+        bump_version(type(instance))
+        bump_version(model)
+
+
+def touch_related_rows(sender, action, instance, model, pk_set, **kwargs):
+    """
+    Updates timestamps of both sides of changed relation, which auto_now misses
+    as only through table is written. Rows losing relation in clear are found
+    before it runs.
+    """
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if action == "pre_clear":
+        source = next(
+            field
+            for field in sender._meta.fields
+            if field.related_model is type(instance)
+        )
+        target = next(
+            field for field in sender._meta.fields if field.related_model is model
+        )
+        pk_set = sender.objects.filter(**{source.attname: instance.pk}).values(
+            target.attname
+        )
+    type(instance).objects.filter(pk=instance.pk).touch()
+    model.objects.filter(pk__in=pk_set).touch()
+
+
+for versioned_model in VERSIONED_MODELS:
+    post_save.connect(bump_saved_model_version, sender=versioned_model)
+    post_delete.connect(bump_deleted_model_version, sender=versioned_model)
+m2m_changed.connect(bump_related_versions, sender=Team.employees.through)
+m2m_changed.connect(bump_related_versions, sender=Reservation.teams.through)
+m2m_changed.connect(touch_related_rows, sender=Team.employees.through)
+m2m_changed.connect(touch_related_rows, sender=Reservation.teams.through)
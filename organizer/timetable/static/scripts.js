@@ -1,21 +1,79 @@
-function apiCheckReservation(date, service) {
-    return fetch(`/reservation/${date}/${service}`,
-    ).then(res => res.json())
-
-            .then(data => {
-                 if (data.is_available) {
-                     commentBox.removeAttribute("disabled");
-                     submitButton.removeAttribute("disabled");
-                     message.innerText = "";
-                 } else {
-                     commentBox.setAttribute("disabled", "");
-                     submitButton.setAttribute("disabled", "");
-                     message.innerText = "Wybrany termin jest zajęty";
-                 }
-            }).catch(error => {
-                console.log(error);
+const availabilityCache = new Map();
+
+function monthRange(date) {
+    const [year, month] = date.split("-").map(Number);
+    const lastDay = new Date(Date.UTC(year, month, 0)).getUTCDate();
+    const monthString = String(month).padStart(2, "0");
+    return {
+        start: `${year}-${monthString}-01`,
+        end: `${year}-${monthString}-${String(lastDay).padStart(2, "0")}`,
+    };
+}
+
+function apiServiceAvailability(service, date) {
+    const range = monthRange(date);
+    const key = `${service}:${range.start}`;
+    if (!availabilityCache.has(key)) {
+        const request = fetch(`/service/${service}/availability/?start=${range.start}&end=${range.end}`)
+            .then(res => res.json())
+            .then(data => new Set(data.occupied))
+            .catch(error => {
+                availabilityCache.delete(key);
+                throw error;
             });
+        availabilityCache.set(key, request);
+    }
+    return availabilityCache.get(key);
+}
+
+function showAvailability(isAvailable) {
+    if (isAvailable) {
+        commentBox.removeAttribute("disabled");
+        submitButton.removeAttribute("disabled");
+        message.innerText = "";
+    } else {
+        commentBox.setAttribute("disabled", "");
+        submitButton.setAttribute("disabled", "");
+        message.innerText = "Wybrany termin jest zajęty";
+    }
+}
+
+function spanDates(start, finish) {
+    const dates = [];
+    const day = new Date(`${start}T00:00:00Z`);
+    const last = new Date(`${finish}T00:00:00Z`);
+    while (day <= last && dates.length <= 366) {
+        dates.push(day.toISOString().slice(0, 10));
+        day.setUTCDate(day.getUTCDate() + 1);
     }
+    return dates;
+}
+
+function checkReservation(date, finish, service) {
+    const dates = spanDates(date, finish);
+    // Span may cross months, availability of every month is fetched once.
+    const months = [...new Set(dates.map(day => day.slice(0, 7)))];
+    return Promise.all(months.map(month => apiServiceAvailability(service, `${month}-01`)))
+        .then(occupiedMonths => {
+            const current = dateTable.value === date
+                && (finishTable.value || date) === finish
+                && serviceButton.value === service;
+            if (current) {
+                showAvailability(
+                    dates.every(day => occupiedMonths.every(occupied => !occupied.has(day)))
+                );
+            }
+        }).catch(error => {
+            console.log(error);
+        });
+}
+
+function todayString() {
+    const today = new Date();
+    const month = String(today.getMonth() + 1).padStart(2, "0");
+    const day = String(today.getDate()).padStart(2, "0");
+    return `${today.getFullYear()}-${month}-${day}`;
+}
 
 const submitButton = document.querySelector("input[type='submit']");
 submitButton.setAttribute("disabled", "");
@@ -23,27 +81,45 @@ const commentBox = document.getElementById("id_comments");
 commentBox.setAttribute("disabled", "");
 const dateTable = document.getElementById("id_target_date");
 dateTable.setAttribute("disabled", "");
+const finishTable = document.getElementById("id_finish_date");
+finishTable.setAttribute("disabled", "");
 const message = document.getElementById("message");
 const serviceButton = document.getElementById("id_service_type")
 
 if (serviceButton.selectedIndex !== 0) {
     dateTable.removeAttribute("disabled");
+    finishTable.removeAttribute("disabled");
     }
 
 serviceButton.addEventListener('change', (event) => {
     dateTable.value = null;
+    finishTable.value = null;
     message.innerText = "";
     commentBox.setAttribute("disabled", "");
     submitButton.setAttribute("disabled", "");
     if (serviceButton.selectedIndex !== 0) {
         dateTable.removeAttribute("disabled");
+        finishTable.removeAttribute("disabled");
+        apiServiceAvailability(serviceButton.value, todayString()).catch(error => {
+            console.log(error);
+        });
     }else {
         dateTable.setAttribute("disabled", "");
+        finishTable.setAttribute("disabled", "");
     }
 });
 
-dateTable.addEventListener('change', (event) => {
+function onDatesChange(event) {
     let dateId = dateTable.value;
+    let finishId = finishTable.value || dateId;
     let serviceId = serviceButton.value;
-    apiCheckReservation(dateId, serviceId)
-});
+    if (dateId && finishId < dateId) {
+        showAvailability(false);
+        message.innerText = "Termin zakończenia jest wcześniejszy niż rozpoczęcia";
+    } else if (dateId) {
+        checkReservation(dateId, finishId, serviceId)
+    }
+}
+
+dateTable.addEventListener('change', onDatesChange);
+finishTable.addEventListener('change', onDatesChange);
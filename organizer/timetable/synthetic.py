@@ -0,0 +1,286 @@
+import datetime
+import itertools
+import math
+import random
+from dataclasses import dataclass
+
+from django.contrib.auth.hashers import make_password
+
+from timetable import workload
+from timetable.caching import bump_version
+from timetable.models import Comments, CustomUser, Employee, Reservation, Services, Team
+
+FIRST_NAMES = (
+    "Anna", "Piotr", "Maria", "Krzysztof", "Katarzyna", "Andrzej", "Małgorzata",
+    "Tomasz", "Agnieszka", "Paweł", "Ewa", "Michał", "Barbara", "Marcin", "Zofia",
+)
+LAST_NAMES = (
+    "Nowak", "Kowalski", "Wiśniewski", "Wójcik", "Kowalczyk", "Kamiński", "Lewandowski",
+    "Zieliński", "Szymański", "Woźniak", "Dąbrowski", "Kozłowski", "Jankowski", "Mazur",
+)
+CITIES = ("Warszawa", "Kraków", "Łódź", "Wrocław", "Poznań", "Gdańsk", "Lublin")
+STREETS = ("Polna", "Leśna", "Słoneczna", "Krótka", "Szkolna", "Ogrodowa", "Lipowa")
+SERVICE_KINDS = (
+    "Malowanie", "Układanie płytek", "Montaż drzwi", "Wymiana okien", "Remont łazienki",
+    "Instalacja elektryczna", "Cyklinowanie", "Przeprowadzka", "Sprzątanie", "Tynkowanie",
+)
+COMMENTS = (
+    "", "", "", "Proszę o telefon przed przyjazdem", "Klucze u sąsiada",
+    "Parking od strony podwórza", "Materiały po stronie klienta", "Pilne",
+)
+SUBJECTS = ("Podziękowanie", "Reklamacja", "Pytanie o termin", "Uwagi do zlecenia")
+TEAM_SIZE = (2, 5)
+
+
+@dataclass
+class Volumes:
+    customers: int
+    employees: int
+    teams: int
+    services: int
+    reservations: int
+    comments: int
+
+    @classmethod
+    def for_reservations(cls, reservations, days):
+        """
+        Returns volumes proportional to number of reservations, with enough
+        services to keep (date, service) grid about two thirds full.
+        """
+        employees = max(12, reservations // 200)
+        return cls(
+            customers=max(10, reservations // 20),
+            employees=employees,
+            teams=max(4, employees // 4),
+            services=max(5, math.ceil(reservations * 1.5 / days)),
+            reservations=reservations,
+            comments=reservations // 10,
+        )
+
+
+def chunks(objects, size):
+    iterator = iter(objects)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+class SyntheticDataGenerator:
+    """
+    Fills database with deterministic synthetic data: the same seed, start date
+    and volumes always give the same rows. Rows are inserted with chunked
+    bulk_create and all customers share one precomputed password hash.
+    Ids of inserted rows are read back as ids greater than last existing one,
+    so nothing else may write to the tables while generator runs.
+    """
+
+    def __init__(
+        self,
+        seed=0,
+        chunk_size=5000,
+        start_date=None,
+        days=730,
+        password="synthetic",
+        log=None,
+    ):
+        self.rng = random.Random(seed)
+        self.chunk_size = chunk_size
+        self.days = days
+        self.start_date = start_date or (
+            datetime.date.today() - datetime.timedelta(days=days // 2)
+        )
+        self.password = password
+        self.log = log or (lambda message: None)
+
+    def generate(self, volumes):
+        if volumes.reservations > volumes.services * self.days:
+            raise ValueError(
+                f"{volumes.services} services over {self.days} days give less than "
+                f"{volumes.reservations} unique reservation slots"
+            )
+        self.customer_ids = self.create_customers(volumes.customers)
+        self.employee_ids, chiefs = self.create_employees(volumes.employees)
+        self.team_ids = self.create_teams(volumes.teams, chiefs)
+        self.service_ids = self.create_services(volumes.services)
+        self.create_reservations(volumes.reservations)
+        self.create_comments(volumes.comments)
+        # Bulk inserts skip signals maintaining workload and change marks,
+        # so they are updated at once.
+        self.log(f"employeeworkload: {workload.rebuild()}")
+        for model in (CustomUser, Employee, Team, Services, Reservation):
+            bump_version(model)
+        return self
+
+    def bulk_create(self, model, objects):
+        """
+        Inserts objects in chunks and returns ids of inserted rows in insertion order.
+        """
+        last_id = model.objects.order_by("-id").values_list("id", flat=True).first() or 0
+        count = 0
+        for chunk in chunks(objects, self.chunk_size):
+            model.objects.bulk_create(chunk)
+            count += len(chunk)
+        self.log(f"{model._meta.model_name}: {count}")
+        return list(
+            model.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+
+    def create_customers(self, count):
+        rng = self.rng
+        password = make_password(self.password)
+        return self.bulk_create(
+            CustomUser,
+            (
+                CustomUser(
+                    email=f"customer{i}@synthetic.example.com",
+                    password=password,
+                    first_name=rng.choice(FIRST_NAMES),
+                    last_name=rng.choice(LAST_NAMES),
+                    phone=str(rng.randrange(500000000, 900000000)),
+                    city=rng.choice(CITIES),
+                    street=f"{rng.choice(STREETS)} {rng.randint(1, 150)}",
+                    postcode=f"{rng.randrange(100):02d}-{rng.randrange(1000):03d}",
+                )
+                for i in range(count)
+            ),
+        )
+
+    def create_employees(self, count):
+        rng = self.rng
+        jobs = ["Chief" if i % 4 == 0 else "Handyman" for i in range(count)]
+        ids = self.bulk_create(
+            Employee,
+            (
+                Employee(
+                    employee_name=rng.choice(FIRST_NAMES),
+                    employee_surname=rng.choice(LAST_NAMES),
+                    job=job,
+                )
+                for job in jobs
+            ),
+        )
+        chiefs = [pk for pk, job in zip(ids, jobs) if job == "Chief"]
+        return ids, chiefs
+
+    def create_teams(self, count, chiefs):
+        """
+        Creates teams of 2 to 5 employees led by one chief. Handymen are drawn
+        from whole staff, so some of them work in more than one team.
+        """
+        rng = self.rng
+        ids = self.bulk_create(
+            Team, (Team(team_name=f"Ekipa {i + 1}") for i in range(count))
+        )
+        chief_ids = set(chiefs)
+        handymen = [pk for pk in self.employee_ids if pk not in chief_ids]
+        memberships = []
+        self.team_sizes = {}
+        for i, team_id in enumerate(ids):
+            size = rng.randint(*TEAM_SIZE)
+            members = [
+                chiefs[i % len(chiefs)],
+                *rng.sample(handymen, min(size - 1, len(handymen))),
+            ]
+            self.team_sizes[team_id] = len(members)
+            memberships.extend(
+                Team.employees.through(team_id=team_id, employee_id=employee_id)
+                for employee_id in members
+            )
+        for chunk in chunks(memberships, self.chunk_size):
+            Team.employees.through.objects.bulk_create(chunk)
+        return ids
+
+    def create_services(self, count):
+        rng = self.rng
+        return self.bulk_create(
+            Services,
+            (
+                Services(
+                    service_name=(
+                        f"{SERVICE_KINDS[i % len(SERVICE_KINDS)]} "
+                        f"{i // len(SERVICE_KINDS) + 1}"
+                    ),
+                    min_team_size=rng.choices((1, 2, 3, 4), weights=(4, 3, 2, 1))[0],
+                )
+                for i in range(count)
+            ),
+        )
+
+    def create_reservations(self, count):
+        """
+        Draws unique (service, date) slots from the grid of all services and days.
+        Past reservations are mostly accepted, future ones half of the time.
+        Accepted ones get a team which is free that day and big enough for the service.
+        """
+        rng = self.rng
+        today = datetime.date.today()
+        services = self.service_ids
+        min_sizes = dict(
+            Services.objects.filter(id__in=services).values_list("id", "min_team_size")
+        )
+        slots = rng.sample(range(len(services) * self.days), count)
+        busy_teams = {}
+        through = Reservation.teams.through
+        last_id = (
+            Reservation.objects.order_by("-id").values_list("id", flat=True).first() or 0
+        )
+        for chunk in chunks(slots, self.chunk_size):
+            reservations = []
+            teams = []
+            for slot in chunk:
+                service_id = services[slot // self.days]
+                date = self.start_date + datetime.timedelta(days=slot % self.days)
+                accepted = rng.random() < (0.9 if date < today else 0.5)
+                team_id = None
+                if accepted:
+                    team_id = self.free_team(
+                        busy_teams.setdefault(date, set()), min_sizes[service_id]
+                    )
+                reservations.append(
+                    Reservation(
+                        customer_id=rng.choice(self.customer_ids),
+                        service_type_id=service_id,
+                        target_date=date,
+                        finish_date=date,
+                        is_accepted=accepted,
+                        comments=rng.choice(COMMENTS),
+                    )
+                )
+                teams.append(team_id)
+            Reservation.objects.bulk_create(reservations)
+            ids = list(
+                Reservation.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", flat=True)
+            )
+            last_id = ids[-1]
+            through.objects.bulk_create(
+                through(reservation_id=reservation_id, team_id=team_id)
+                for reservation_id, team_id in zip(ids, teams)
+                if team_id is not None
+            )
+        self.log(f"reservation: {count}")
+
+    def free_team(self, busy, min_size):
+        for _ in range(10):
+            team_id = self.rng.choice(self.team_ids)
+            if team_id not in busy and self.team_sizes[team_id] >= min_size:
+                busy.add(team_id)
+                return team_id
+        return None
+
+    def create_comments(self, count):
+        rng = self.rng
+        self.bulk_create(
+            Comments,
+            (
+                Comments(
+                    subject=rng.choice(SUBJECTS),
+                    content=rng.choice(COMMENTS[3:]),
+                    sender_id=rng.choice(self.customer_ids),
+                    recipient_id=rng.choice(self.employee_ids),
+                )
+                for _ in range(count)
+            ),
+        )
@@ -1,10 +1,45 @@
+import asyncio
+import csv
+import json
+import datetime
+from collections import Counter
+
 import pytest
-from django.test import TestCase, Client
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import TestCase, Client, AsyncClient, RequestFactory
 from http import HTTPStatus
 
-from django.urls import reverse
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from timetable.availability import availability_index
+from timetable.benchmarks import regressions, run_scale
+from timetable.conflicts import team_clashes
+from timetable.forms import ManageReservationForm
+from timetable.loadtest import LoadTestResult, ReservationLoadTest, cleanup
+from timetable.managers import ReservationQuerySet
+from timetable.metrics import request_metrics
+from timetable.queryplans import reservation_urls, sequential_scans
+from timetable.routers import PIN_COOKIE, PrimaryReplicaRouter, ReplicaPinMiddleware
+from timetable.scheduling import commit_schedule, plan_schedule
 
-from timetable.models import CustomUser, Team, Services, Reservation
+from timetable.models import (
+    CustomUser,
+    Employee,
+    EmployeeWorkload,
+    ModelChangeMark,
+    Team,
+    Services,
+    Reservation,
+    RecurringReservation,
+)
+from timetable.views import AllReservationsView
+from timetable.workload import refresh as refresh_workload
 
 
 def test_main_page():
@@ -87,3 +122,906 @@ def test_add_reservation():
         data={"target_date": "abc", "comments": "abc", "service_type": 1},
     )
     assert response.status_code == 200  # when form is not valid
+
+
+@pytest.mark.django_db
+def test_service_availability():
+    """
+    Tests listing occupied dates of service in given date range.
+    """
+    u = CustomUser.objects.create_user(email="user@user.com", password="123")
+    s = Services.objects.create(service_name="abc")
+    other = Services.objects.create(service_name="def")
+    start = datetime.date.today() + datetime.timedelta(days=1)
+    Reservation.objects.create(customer=u, service_type=s, target_date=start)
+    Reservation.objects.create(
+        customer=u, service_type=s, target_date=start + datetime.timedelta(days=2)
+    )
+    Reservation.objects.create(customer=u, service_type=other, target_date=start)
+    c = Client()
+    url = reverse("service-availability", kwargs={"service": s.id})
+    end = start + datetime.timedelta(days=5)
+    response = c.get(url, {"start": start.isoformat(), "end": end.isoformat()})
+    assert response.status_code == 200
+    assert response.json()["occupied"] == [
+        start.isoformat(),
+        (start + datetime.timedelta(days=2)).isoformat(),
+    ]
+    response = c.get(url, {"start": end.isoformat(), "end": start.isoformat()})
+    assert response.status_code == 400
+    response = c.get(url, {"start": "abc"})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_availability_index(django_capture_on_commit_callbacks):
+    """
+    Tests lazy loading of availability index and its invalidation after reservation
+    changes.
+    """
+    u = CustomUser.objects.create_user(email="user@user.com", password="123")
+    s = Services.objects.create(service_name="abc")
+    date = datetime.date.today() + datetime.timedelta(days=1)
+    assert availability_index.is_available(s.id, date)
+    with django_capture_on_commit_callbacks(execute=True):
+        r = Reservation.objects.create(customer=u, service_type=s, target_date=date)
+    c = Client()
+    url = reverse("check-reservation", kwargs={"date": date.isoformat(), "service": s.id})
+    assert c.get(url).json() == {"is_available": False}  # reloads changed set
+    with CaptureQueriesContext(connection) as queries:
+        response = c.get(url)
+    assert response.json() == {"is_available": False}
+    assert len(queries) == 0
+    with django_capture_on_commit_callbacks(execute=True):
+        r.target_date = r.finish_date = date + datetime.timedelta(days=1)
+        r.save()
+    assert availability_index.is_available(s.id, date)
+    assert not availability_index.is_available(s.id, r.target_date)
+    with django_capture_on_commit_callbacks(execute=True):
+        r.delete()
+    assert availability_index.is_available(s.id, r.target_date)
+
+
+def create_reservations(count, accepted=False):
+    """
+    Creates given number of reservations, each with its own customer and service.
+    """
+    date = datetime.date.today() + datetime.timedelta(days=1)
+    start = Reservation.objects.count()
+    for i in range(start, start + count):
+        customer = CustomUser.objects.create_user(email=f"customer{i}@user.com")
+        service = Services.objects.create(service_name=f"service{i}")
+        Reservation.objects.create(
+            customer=customer,
+            service_type=service,
+            target_date=date + datetime.timedelta(days=i % 7),
+            is_accepted=accepted,
+        )
+
+
+@pytest.mark.django_db
+def test_all_reservations_pagination(monkeypatch):
+    """
+    Tests paging through all reservations with constant number of queries.
+    """
+    monkeypatch.setattr(AllReservationsView, "paginate_by", 10)
+    CustomUser.objects.create_superuser(email="admin@user.com", password="123")
+    c = Client()
+    c.login(email="admin@user.com", password="123")
+    url = reverse("all-reservations")
+    create_reservations(3)
+    c.get(url)  # fills cached filter choices
+    with CaptureQueriesContext(connection) as small:
+        assert c.get(url).status_code == 200
+    create_reservations(30, accepted=True)
+    with CaptureQueriesContext(connection) as large:
+        response = c.get(url)
+    assert len(small) == len(large)
+    seen = list(response.context["reservations"])
+    assert len(seen) == 10
+    while response.context["next_query"]:
+        response = c.get(f"{url}?{response.context['next_query']}")
+        seen += list(response.context["reservations"])
+    assert len(seen) == 33
+    assert len({r.id for r in seen}) == 33
+    assert seen == sorted(seen, key=lambda r: (r.target_date, r.id))
+    response = c.get(url, {"status": "pending"})
+    assert len(response.context["reservations"]) == 3
+
+
+@pytest.mark.django_db
+def test_all_employees_filters():
+    """
+    Tests filtering employees by surname prefix and job with selected page size.
+    """
+    CustomUser.objects.create_superuser(email="admin@user.com", password="123")
+    for i in range(30):
+        Employee.objects.create(
+            employee_name="a", employee_surname=f"Kowalski{i:02}", job="Handyman"
+        )
+    Employee.objects.create(employee_name="a", employee_surname="Nowak", job="Chief")
+    c = Client()
+    c.login(email="admin@user.com", password="123")
+    url = reverse("all-employees")
+    response = c.get(url, {"surname": "Kow", "page_size": "25"})
+    assert len(response.context["employees"]) == 25
+    response = c.get(f"{url}?{response.context['next_query']}")
+    assert len(response.context["employees"]) == 5
+    assert response.context["next_query"] is None
+    response = c.get(url, {"job": "Chief"})
+    assert [e.employee_surname for e in response.context["employees"]] == ["Nowak"]
+
+
+def create_teams(count, members=3):
+    """
+    Creates given number of teams with their own members and one upcoming accepted reservation.
+    """
+    start = Team.objects.count()
+    for i in range(start, start + count):
+        team = Team.objects.create(team_name=f"team{i}")
+        team.employees.set(
+            Employee.objects.create(
+                employee_name="a", employee_surname=f"b{i}-{j}", job="Handyman"
+            )
+            for j in range(members)
+        )
+        create_reservations(1, accepted=True)
+        Reservation.objects.latest("id").teams.add(team)
+
+
+@pytest.mark.django_db
+def test_team_roster(django_capture_on_commit_callbacks):
+    """
+    Tests team roster counts and constant number of queries of team list and details.
+    """
+    CustomUser.objects.create_superuser(email="admin@user.com", password="123")
+    c = Client()
+    c.login(email="admin@user.com", password="123")
+    url = reverse("all-teams")
+    create_teams(2)
+    with CaptureQueriesContext(connection) as small:
+        c.get(url)
+    with django_capture_on_commit_callbacks(execute=True):
+        create_teams(20)
+    with CaptureQueriesContext(connection) as large:
+        response = c.get(url)
+    assert len(small) == len(large)
+    team = response.context["teams"].object_list[0]
+    assert team.member_count == 3
+    assert team.upcoming_reservations == 1
+    # Job in progress is still upcoming, both in count and in list.
+    yesterday = datetime.date.today() - datetime.timedelta(days=1)
+    Reservation.objects.filter(teams=team).update(target_date=yesterday)
+    url = reverse("team-details", kwargs={"team_id": team.id})
+    with CaptureQueriesContext(connection) as details:
+        response = c.get(url)
+    assert len(details) == len(small) + 2  # team timestamp, upcoming reservations
+    assert len(response.context["upcoming_reservations"]) == 1
+    assert response.context["team"].upcoming_reservations == 1
+
+
+@pytest.mark.django_db
+def test_reservation_query_plans():
+    """
+    Tests that no view reading reservations scans whole reservation table.
+    """
+    admin = CustomUser.objects.create_superuser(email="admin@user.com", password="123")
+    create_reservations(40)
+    create_teams(10)
+    c = Client()
+    c.force_login(admin)
+    urls = reservation_urls()
+    assert sequential_scans(c, urls, connection, threshold=10000) == []
+    assert sequential_scans(c, urls, connection, threshold=20) == []
+
+
+@pytest.mark.django_db
+def test_schedule_reservations():
+    """
+    Tests assigning teams big enough for reserved service, one job per team a day.
+    """
+    u = CustomUser.objects.create_user(email="user@user.com", password="123")
+    small = Services.objects.create(service_name="small", min_team_size=1)
+    big = Services.objects.create(service_name="big", min_team_size=3)
+    huge = Services.objects.create(service_name="huge", min_team_size=5)
+    date = datetime.date.today() + datetime.timedelta(days=1)
+    create_teams(1, members=1)
+    create_teams(1, members=3)
+    busy_team = Team.objects.latest("id")
+    create_teams(1, members=3)
+    later = date + datetime.timedelta(days=10)
+    Reservation.objects.update(target_date=later, finish_date=later)
+    Reservation.objects.filter(teams=busy_team).update(target_date=date, finish_date=date)
+    for service in (small, big, huge):
+        Reservation.objects.create(customer=u, service_type=service, target_date=date)
+    plan = plan_schedule(date, date)
+    assigned = {r.service_type: team for r, team in plan.assignments}
+    assert assigned[small].employees.count() == 1
+    assert assigned[big].employees.count() == 3
+    assert assigned[big] != busy_team
+    assert [r.service_type for r in plan.unassigned] == [huge]
+    admin = CustomUser.objects.create_superuser(email="admin@user.com", password="123")
+    c = Client()
+    c.force_login(admin)
+    url = reverse("schedule-reservations")
+    response = c.get(url, {"date_from": date, "date_to": date})
+    assert len(response.context["plan"]) == 2
+    response = c.post(url, {"date_from": date, "date_to": date, "accept": "on"})
+    assert response.status_code == 200
+    assert Reservation.objects.get(service_type=big).teams.get() == assigned[big]
+    assert Reservation.objects.get(service_type=big).is_accepted
+    assert not Reservation.objects.get(service_type=huge).is_accepted
+    assert len(commit_schedule(date, date)) == 0
+
+
+@pytest.mark.django_db
+def test_import_reservations(tmp_path):
+    """
+    Tests importing reservations with rejecting conflicting and invalid rows.
+    """
+    u = CustomUser.objects.create_user(email="user@user.com", password="123")
+    s = Services.objects.create(service_name="abc")
+    team = Team.objects.create(team_name="A")
+    date = datetime.date.today() + datetime.timedelta(days=1)
+    Reservation.objects.create(customer=u, service_type=s, target_date=date)
+    day = datetime.timedelta(days=1)
+    source = tmp_path / "reservations.csv"
+    source.write_text(
+        "customer,service,target_date,comments,is_accepted,teams\n"
+        f"user@user.com,abc,{date + day},a,1,A\n"
+        f"user@user.com,{s.id},{date + day},b,0,\n"
+        f"user@user.com,abc,{date},c,0,\n"
+        f"nobody@user.com,abc,{date + 2 * day},d,0,\n"
+        "user@user.com,abc,abc,e,0,\n"
+        f"user@user.com,abc,{date + 3 * day},f,0,A;B\n"
+    )
+    rejects = tmp_path / "rejects.csv"
+    call_command("import_reservations", str(source), rejects=str(rejects), chunk_size=2)
+    imported = Reservation.objects.get(target_date=date + day)
+    assert imported.is_accepted
+    assert list(imported.teams.all()) == [team]
+    assert Reservation.objects.count() == 2
+    rejected = sorted(row["comments"] for row in csv.DictReader(rejects.open()))
+    assert rejected == ["b", "c", "d", "e", "f"]
+    assert not availability_index.is_available(s.id, date + day)
+
+
+@pytest.mark.django_db
+def test_batch_reservations():
+    """
+    Tests accepting with team assignment and rejecting selected reservations at once.
+    """
+    admin = CustomUser.objects.create_superuser(email="admin@user.com", password="123")
+    create_reservations(4)
+    team = Team.objects.create(team_name="A")
+    first, second, third, fourth = Reservation.objects.order_by("id")
+    c = Client()
+    c.force_login(admin)
+    url = reverse("batch-reservations")
+    response = c.post(
+        url, {"reservations": [first.id, second.id], "teams": [team.id], "action": "accept"}
+    )
+    assert response.status_code == 200
+    assert Reservation.objects.filter(is_accepted=True, teams=team).count() == 2
+    response = c.post(url, {"reservations": [first.id, third.id], "action": "reject"})
+    assert response.status_code == 400  # first is not pending anymore
+    c.post(url, {"reservations": [third.id], "action": "reject"})
+    assert not Reservation.objects.filter(pk=third.id).exists()
+    assert not Reservation.objects.get(pk=fourth.id).is_accepted
+
+
+@pytest.mark.django_db
+def test_async_availability_views():
+    """
+    Tests JSON availability endpoints served by coroutine views.
+    """
+    u = CustomUser.objects.create_user(email="user@user.com", password="123")
+    s = Services.objects.create(service_name="abc")
+    date = datetime.date.today() + datetime.timedelta(days=1)
+    Reservation.objects.create(customer=u, service_type=s, target_date=date)
+    c = AsyncClient()
+
+    async def get(url, data=None):
+        return await c.get(url, data)
+
+    url = reverse("check-reservation", kwargs={"date": date.isoformat(), "service": s.id})
+    assert asyncio.iscoroutinefunction(resolve(url).func)
+    response = async_to_sync(get)(url)
+    assert response.json() == {"is_available": False}
+    response = async_to_sync(get)(
+        reverse("check-reservation", kwargs={"date": "abc", "service": s.id})
+    )
+    assert response.status_code == 400
+    url = reverse("service-availability", kwargs={"service": s.id})
+    response = async_to_sync(get)(url, {"start": date.isoformat(), "end": date.isoformat()})
+    assert response.json()["occupied"] == [date.isoformat()]
+
+
+@pytest.mark.parametrize("backend", ["locmem", "filebased"])
+@pytest.mark.django_db
+def test_versioned_response_cache(backend, settings, tmp_path, django_capture_on_commit_callbacks):
+    """
+    Tests serving cached services list until service is added.
+    """
+    if backend == "filebased":
+        settings.CACHES = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": str(tmp_path),
+            }
+        }
+    admin = CustomUser.objects.create_superuser(email="admin@user.com", password="123")
+    Services.objects.create(service_name="abc")
+    c = Client()
+    c.force_login(admin)
+    url = reverse("all-services")
+    assert c.get(url)["X-Cache"] == "MISS"
+    response = c.get(url)
+    assert response["X-Cache"] == "HIT"
+    assert "abc" in response.content.decode()
+    with django_capture_on_commit_callbacks(execute=True):
+        c.post(reverse("add-service"), {"service_name": "def", "min_team_size": 1})
+    response = c.get(url)
+    assert response["X-Cache"] == "MISS"
+    assert "def" in response.content.decode()
+    stats = c.get(reverse("cache-stats")).json()
+    assert stats["AllServicesView"] == {"hits": 1, "misses": 2}
+
+
+@pytest.mark.django_db
+def test_cached_form_choices(django_capture_on_commit_callbacks):
+    """
+    Tests rendering form choices from cache until underlying model changes.
+    """
+    admin = CustomUser.objects.create_superuser(email="admin@user.com", password="123")
+    create_teams(2)
+    reservation = Reservation.objects.first()
+    c = Client()
+    c.force_login(admin)
+    url = reverse("manage-reservation", kwargs={"pk": reservation.pk})
+    with CaptureQueriesContext(connection) as cold:
+        c.get(url)
+    with CaptureQueriesContext(connection) as warm:
+        response = c.get(url)
+    assert len(cold) - len(warm) == 3  # customers, teams and services
+    assert "team1" in response.content.decode()
+    url = reverse("modify-team", kwargs={"pk": Team.objects.first().pk})
+    c.get(url)
+    with django_capture_on_commit_callbacks(execute=True):
+        Employee.objects.create(employee_name="a", employee_surname="Nowak", job="Chief")
+    assert "Nowak" in c.get(url).content.decode()
+
+
+@pytest.mark.skipif(
+    "replica" not in settings.DATABASES, reason="needs 'replica' database alias"
+)
+@pytest.mark.django_db(transaction=True, databases=["default", "replica"])
+def test_replica_routing():
+    """
+    Tests reading from replica in read-only views until client writes to primary.
+    Replica is separate database here, so it behaves like replica lagging behind.
+    """
+    admin = CustomUser.objects.create_superuser(email="admin@user.com", password="123")
+    admin.save(using="replica")
+    Employee.objects.create(employee_name="a", employee_surname="Kowalski", job="Chief")
+    c = Client()
+    c.force_login(admin)
+    response = c.get("/all-employees/")
+    assert "Kowalski" not in response.content.decode()
+    assert PIN_COOKIE not in response.cookies
+    response = c.post(
+        "/add-employee/",
+        {"employee_name": "b", "employee_surname": "Nowak", "job": "Chief"},
+    )
+    assert PIN_COOKIE in response.cookies
+    content = c.get("/all-employees/").content.decode()
+    assert "Kowalski" in content and "Nowak" in content
+    assert not Employee.objects.using("replica").exists()
+
+
+def test_replica_pin_middleware_async():
+    """
+    Tests that replica pin middleware runs in async chain without adapting it to sync.
+    """
+
+    async def get_response(request):
+        PrimaryReplicaRouter().db_for_write(Employee)
+        return HttpResponse()
+
+    middleware = ReplicaPinMiddleware(get_response)
+    assert asyncio.iscoroutinefunction(middleware)
+    assert asyncio.iscoroutinefunction(middleware.process_view)
+    response = async_to_sync(middleware)(RequestFactory().post("/add-employee/"))
+    assert PIN_COOKIE in response.cookies
+
+
+@pytest.mark.django_db
+def test_login_failures(settings, django_capture_on_commit_callbacks):
+    """
+    Tests remembering unknown emails and throttling repeated login failures.
+    """
+    settings.LOGIN_FAILURE_LIMIT = 3
+    c = Client()
+    data = {"username": "new@user.com", "password": "123"}
+    assert c.post("/login/", data).url == "/add-user/"
+    with CaptureQueriesContext(connection) as queries:
+        assert c.post("/login/", data).url == "/add-user/"
+    assert len(queries) == 0
+    with django_capture_on_commit_callbacks(execute=True):
+        CustomUser.objects.create_user(email="new@user.com", password="123")
+    assert c.post("/login/", data).url == reverse("index")
+    c.logout()
+    other_case = {"username": "New@user.com", "password": "123"}
+    assert c.post("/login/", other_case).url == "/add-user/"
+    assert c.post("/login/", data).url == reverse("index")
+    c.logout()
+    for _ in range(3):
+        response = c.post("/login/", {"username": "new@user.com", "password": "x"})
+        assert "Nieprawidłowy login lub hasło" in response.content.decode()
+    response = c.post("/login/", data)
+    assert response.status_code == 429
+
+
+@pytest.mark.django_db
+def test_request_metrics(settings, caplog):
+    """
+    Tests recording per-view metrics and logging slow requests with their SQL.
+    """
+    settings.METRICS_SLOW_REQUEST_SECONDS = 0
+    settings.METRICS_SLOW_REQUEST_SAMPLE_RATE = 1
+    admin = CustomUser.objects.create_superuser(email="admin@user.com", password="123")
+    create_reservations(3)
+    c = Client()
+    c.force_login(admin)
+    with CaptureQueriesContext(connection) as queries:
+        c.get("/all-reservations/")
+    query_count = len(queries)
+    assert "timetable_reservation" in caplog.text
+    response = c.get("/metrics/")
+    assert response["Content-Type"].startswith("text/plain")
+    content = response.content.decode()
+    assert 'organizer_request_duration_seconds_count{view="all-reservations"} 1' in content
+    assert f'organizer_request_queries_sum{{view="all-reservations"}} {query_count}' in content
+    assert c.get("/metrics/").status_code == 200
+    with CaptureQueriesContext(connection) as queries:
+        response = c.get(reverse("reservation-export"))
+        assert "reservation-export" not in request_metrics.views
+        b"".join(response.streaming_content)
+    assert request_metrics.views["reservation-export"].queries.sum == len(queries)
+    c.logout()
+    assert c.get("/metrics/").status_code == 302
+    s = Services.objects.create(service_name="abc")
+    url = reverse("check-reservation", kwargs={"date": "2030-01-01", "service": s.id})
+
+    async def get():
+        return await AsyncClient().get(url)
+
+    with CaptureQueriesContext(connection) as queries:
+        assert async_to_sync(get)().status_code == 200
+    assert request_metrics.views["check-reservation"].queries.sum == len(queries) > 0
+
+
+@pytest.mark.django_db
+def test_benchmark_routes():
+    """
+    Tests measuring every named route on seeded database and comparing with baseline.
+    """
+    results = run_scale(Client(), 50, repeat=2)
+    assert {"index", "all-reservations", "check-reservation"} <= results.keys()
+    assert "logout" not in results
+    assert results["all-reservations"]["status"] == 200
+    assert not Reservation.objects.exists()
+    baseline = {"50": results}
+    assert regressions({"50": results}, baseline, threshold=0.25) == []
+    slower = {"50": {"index": {**results["index"], "p95": results["index"]["p95"] * 2 + 1}}}
+    assert regressions(slower, baseline, threshold=0.25)
+
+
+@pytest.mark.django_db
+def test_generate_data():
+    """
+    Tests generating the same synthetic data for the same seed.
+    """
+
+    def snapshot():
+        return list(
+            Reservation.objects.order_by("id").values_list(
+                "customer__email", "service_type__service_name", "target_date", "is_accepted"
+            )
+        )
+
+    call_command("generate_data", reservations=300, seed=7, start_date=datetime.date(2030, 1, 1))
+    assert Reservation.objects.count() == 300
+    assert CustomUser.objects.count() == 15
+    first = snapshot()
+    assert Team.objects.filter(employees__job="Chief").count() == Team.objects.count()
+    assert not (
+        Reservation.teams.through.objects.values("team", "reservation__target_date")
+        .annotate(count=Count("id"))
+        .filter(count__gt=1)
+    )
+    assert Client().login(email="customer0@synthetic.example.com", password="synthetic")
+    for model in (Reservation, Team, Employee, Services, CustomUser):
+        model.objects.all().delete()
+    call_command("generate_data", reservations=300, seed=7, start_date=datetime.date(2030, 1, 1))
+    assert snapshot() == first
+
+
+@pytest.mark.parametrize("mode, users", [("wsgi", 1), ("asgi", 2)])
+@pytest.mark.django_db(transaction=True)
+def test_loadtest_reservations(mode, users, monkeypatch):
+    """
+    Tests counting bookings, rejected submits and unique slot violations of
+    virtual users competing for single slot.
+    """
+    Services.objects.create(service_name="a")
+
+    async def ais_available(service_id, date, finish=None):
+        return True
+
+    # Stale availability and overlap check reading snapshot from before concurrent
+    # insert let every submit reach INSERT; all but first are stopped by unique
+    # constraint. Database work stays serialized (single thread or shared sync
+    # thread of ASGI handler), so outcomes don't depend on scheduling.
+    monkeypatch.setattr(availability_index, "is_available", lambda *args: True)
+    monkeypatch.setattr(availability_index, "ais_available", ais_available)
+    monkeypatch.setattr(ReservationQuerySet, "overlapping", lambda self, *args: self.none())
+    load_test = ReservationLoadTest(users=users, iterations=2, services=1, days=1)
+    summary = load_test.run(mode).summary()
+    submits = users * 2
+    assert summary["outcomes"] == {"booked": 1, "taken_on_submit": submits - 1}
+    assert summary["integrity_errors"] == {"unique_service_date": submits - 1}
+    assert summary["steps"]["book"]["requests"] == submits
+    assert summary["steps"]["book"]["error_rate"] == 0
+    assert Reservation.objects.count() == 1
+    cleanup()
+    assert not Reservation.objects.exists()
+    assert not CustomUser.objects.exists()
+
+
+def test_loadtest_single_sample():
+    """
+    Tests percentiles of step requested only once.
+    """
+    result = LoadTestResult(duration=1.0)
+    result.record("book", 0.25, 302)
+    steps = result.summary()["steps"]
+    assert steps["book"]["p50_ms"] == steps["book"]["p99_ms"] == 250.0
+
+
+@pytest.mark.django_db
+def test_recurring_reservations(django_capture_on_commit_callbacks):
+    """
+    Tests checking dates against recurring reservation rule without storing occurrences.
+    """
+    user = CustomUser.objects.create_user(email="a@b.com", password="123")
+    service = Services.objects.create(service_name="Sprzątanie")
+    start = datetime.date.today() + datetime.timedelta(days=7)
+    c = Client()
+    c.force_login(user)
+    data = {
+        "service_type": service.pk,
+        "frequency": "weekly",
+        "interval": 2,
+        "start_date": start.isoformat(),
+        "comments": "",
+    }
+    with django_capture_on_commit_callbacks(execute=True):
+        response = c.post("/reservation/recurring/", data)
+    assert response.url == f"/user/{user.id}/recurring/"
+    assert not Reservation.objects.exists()
+    far = start + datetime.timedelta(weeks=2 * 500)
+    for date, is_available in ((far, False), (far + datetime.timedelta(weeks=1), True)):
+        response = c.get(f"/reservation/{date.isoformat()}/{service.pk}")
+        assert response.json() == {"is_available": is_available}
+    response = c.post(
+        "/reservation/",
+        {"service_type": service.pk, "target_date": far.isoformat(), "comments": "a"},
+    )
+    assert "Wybrany termin jest zajęty" in response.content.decode()
+    response = c.post(
+        "/reservation/recurring/",
+        {**data, "frequency": "monthly", "interval": 1, "start_date": far.isoformat()},
+    )
+    assert f"Termin {far.isoformat()} jest zajęty" in response.content.decode()
+    assert RecurringReservation.objects.count() == 1
+    response = c.get(f"/user/{user.id}/recurring/?month={start:%Y-%m}")
+    assert start.isoformat() in response.content.decode()
+    other = Services.objects.create(service_name="Ogród")
+    assert availability_index.is_available(other.pk, start)
+    # Booking committed after dates were cached passes form validation, but rule
+    # is checked again against dates read from database under lock.
+    Reservation.objects.create(customer=user, service_type=other, target_date=start)
+    response = c.post("/reservation/recurring/", {**data, "service_type": other.pk})
+    assert f"Termin {start.isoformat()} jest zajęty" in response.content.decode()
+    rules = availability_index.rules(service.pk)
+    key = availability_index.rules_key(service.pk)
+    with django_capture_on_commit_callbacks(execute=True):
+        RecurringReservation.objects.get().delete()
+    # Rules loaded before delete and stored after it stay under version left behind.
+    availability_index.cache.set(key, rules)
+    assert availability_index.rules(service.pk) == ()
+
+
+@pytest.mark.django_db
+def test_multi_day_reservations(django_capture_on_commit_callbacks):
+    """
+    Tests rejecting reservations overlapping multi-day reservation of the same service
+    and reading days taken by team.
+    """
+    user = CustomUser.objects.create_user(email="a@b.com", password="123")
+    service = Services.objects.create(service_name="Remont")
+    start = datetime.date.today() + datetime.timedelta(days=3)
+    finish = start + datetime.timedelta(days=4)
+    c = Client()
+    c.force_login(user)
+    data = {
+        "service_type": service.pk,
+        "target_date": start.isoformat(),
+        "finish_date": finish.isoformat(),
+        "comments": "a",
+    }
+    with django_capture_on_commit_callbacks(execute=True):
+        response = c.post("/reservation/", data)
+    reservation = Reservation.objects.get()
+    assert response.url == f"/reservation/{reservation.id}"
+    assert len(reservation.dates) == 5
+    inside = start + datetime.timedelta(days=2)
+    assert not availability_index.is_available(service.pk, inside)
+    day_before = start - datetime.timedelta(days=1)
+    response = c.get(f"/reservation/{day_before.isoformat()}/{service.pk}", {"finish": start})
+    assert response.json() == {"is_available": False}
+    too_long = start + datetime.timedelta(days=settings.MAX_RESERVATION_DAYS)
+    response = c.get(f"/reservation/{start.isoformat()}/{service.pk}", {"finish": too_long})
+    assert response.status_code == 400
+    # Stale index lets overlapping reservation reach check in booking transaction.
+    availability_index.cache.set(availability_index.key(service.pk), frozenset())
+    response = c.post(
+        "/reservation/",
+        {**data, "target_date": inside.isoformat(), "finish_date": ""},
+    )
+    assert "Wybrany termin jest zajęty" in response.content.decode()
+    response = c.post("/reservation/", {**data, "finish_date": too_long.isoformat()})
+    assert "Rezerwacja może trwać najwyżej" in response.content.decode()
+    assert Reservation.objects.count() == 1
+
+    team = Team.objects.create(team_name="Ekipa")
+    reservation.teams.add(team)
+    staff = CustomUser.objects.create_superuser(email="staff@b.com", password="123")
+    c.force_login(staff)
+    url = reverse("team-availability", kwargs={"team_id": team.pk})
+    response = c.get(url, {"start": inside, "end": finish + datetime.timedelta(days=9)})
+    assert response.json()["occupied"] == [
+        date.isoformat() for date in reservation.dates if date >= inside
+    ]
+
+
+@pytest.mark.django_db
+def test_team_clashes():
+    """
+    Tests refusing to book team twice on one day and reporting existing clashes.
+    """
+    admin = CustomUser.objects.create_superuser(email="admin@user.com", password="123")
+    create_reservations(8)
+    team = Team.objects.create(team_name="A")
+    first, second, *others, eighth = Reservation.objects.order_by("id")
+    assert eighth.target_date == first.target_date
+    first.teams.add(team)
+    c = Client()
+    c.force_login(admin)
+    response = c.post(
+        reverse("batch-reservations"),
+        {"reservations": [second.id, eighth.id], "teams": [team.id], "action": "accept"},
+    )
+    assert response.status_code == 409
+    assert not eighth.teams.exists()
+    form = ManageReservationForm(
+        {
+            "customer": eighth.customer_id,
+            "teams": [team.id],
+            "target_date": eighth.target_date,
+            "finish_date": eighth.finish_date,
+            "comments": "a",
+            "service_type": eighth.service_type_id,
+        },
+        instance=eighth,
+    )
+    assert form.errors["teams"] == ["Ekipa A ma już zlecenie w tym terminie"]
+    # Assignments made before checks existed still show up in report.
+    eighth.teams.add(team)
+    with CaptureQueriesContext(connection) as queries:
+        clashes = team_clashes(first.target_date, first.target_date)
+    assert len(queries) == 1
+    assert [(clash.reservation_id, clash.other_id) for clash in clashes] == [(first.id, eighth.id)]
+    response = c.get(reverse("team-clashes"), {"start": first.target_date})
+    assert f"/reservation/{eighth.id}/" in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_employee_workload(django_capture_on_commit_callbacks):
+    """
+    Tests keeping weekly employee workload up to date with reservations and teams.
+    """
+
+    def workload():
+        return set(EmployeeWorkload.objects.values_list("employee_id", "week_start", "jobs"))
+
+    admin = CustomUser.objects.create_superuser(email="admin@user.com", password="123")
+    create_reservations(2)
+    first, second = Reservation.objects.order_by("id")
+    chief, handyman = (
+        Employee.objects.create(employee_name="a", employee_surname=name, job="Chief")
+        for name in ("b", "c")
+    )
+    team = Team.objects.create(team_name="A")
+    week = first.target_date - datetime.timedelta(days=first.target_date.weekday())
+    with django_capture_on_commit_callbacks(execute=True):
+        team.employees.add(chief)
+        first.teams.add(team)
+        assert workload() == set()
+        first.is_accepted = True
+        first.save()
+    assert workload() == {(chief.id, week, 1)}
+    with django_capture_on_commit_callbacks(execute=True):
+        team.employees.add(handyman)
+        first.target_date = first.finish_date = first.target_date + datetime.timedelta(weeks=1)
+        first.save()
+    next_week = week + datetime.timedelta(weeks=1)
+    assert workload() == {(chief.id, next_week, 1), (handyman.id, next_week, 1)}
+    c = Client()
+    c.force_login(admin)
+    second.teams.add(team)
+    with django_capture_on_commit_callbacks(execute=True):
+        c.post(reverse("batch-reservations"), {"reservations": [second.id], "action": "accept"})
+    second_week = second.target_date - datetime.timedelta(days=second.target_date.weekday())
+    assert (chief.id, second_week, 1 + (second_week == next_week)) in workload()
+    incremental = workload()
+    call_command("rebuild_workload")
+    assert workload() == incremental
+    gap = next_week + datetime.timedelta(weeks=3)
+    EmployeeWorkload.objects.create(employee=chief, week_start=gap, jobs=7)
+    refresh_workload([chief.id], [week, gap + datetime.timedelta(weeks=3)])
+    assert workload() == incremental | {(chief.id, gap, 7)}  # only given weeks
+    EmployeeWorkload.objects.filter(week_start=gap).delete()
+    response = c.get(reverse("workload"), {"start": next_week, "end": next_week})
+    assert str(handyman) in response.content.decode()
+    with django_capture_on_commit_callbacks(execute=True):
+        team.employees.remove(handyman)
+        first.teams.clear()
+        second.delete()
+    assert workload() == set()
+
+
+@pytest.mark.django_db
+def test_reservation_calendar(django_capture_on_commit_callbacks):
+    """
+    Tests month calendar read with one reservation query and answered with
+    304 Not Modified until reservations change.
+    """
+    admin = CustomUser.objects.create_superuser(email="admin@user.com", password="123")
+    create_teams(3)
+    reservation = Reservation.objects.order_by("id").first()
+    reservation.teams.add(*Team.objects.all())
+    c = Client()
+    c.force_login(admin)
+    url = reverse("reservation-calendar")
+    month = {"month": f"{reservation.target_date:%Y-%m}"}
+    with CaptureQueriesContext(connection) as queries:
+        response = c.get(url, month)
+    assert response.status_code == 200
+    reads = [q["sql"] for q in queries if "timetable_reservation" in q["sql"]]
+    assert len([sql for sql in reads if "timetable_modelchangemark" not in sql]) == 1
+    assert "team0, team1, team2" in response.content.decode()
+    etag = response["ETag"]
+    response = c.get(url, month, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    with django_capture_on_commit_callbacks(execute=True):
+        reservation.teams.remove(Team.objects.get(team_name="team2"))
+    response = c.get(url, month, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert "team0, team1, team2" not in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_modification_timestamps(django_capture_on_commit_callbacks):
+    """
+    Tests timestamps kept by bulk updates and relation changes, and detail and list
+    pages answered with 304 Not Modified until their data change.
+    """
+    admin = CustomUser.objects.create_superuser(email="admin@user.com", password="123")
+    create_teams(2)
+    team, other = Team.objects.order_by("id")
+    reservation = Reservation.objects.order_by("id").first()
+    before = reservation.updated_at
+    Reservation.objects.filter(pk=reservation.pk).update(comments="Pilne")
+    reservation.refresh_from_db()
+    assert reservation.updated_at > before
+    before = other.updated_at
+    reservation.teams.add(other)
+    other.refresh_from_db()
+    assert other.updated_at > before
+    c = Client()
+    c.force_login(admin)
+    details = reverse("team-details", kwargs={"team_id": team.id})
+    teams = reverse("all-teams")
+    response = c.get(details)
+    etag, modified = response["ETag"], response["Last-Modified"]
+    assert c.get(details, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    assert c.get(details, HTTP_IF_MODIFIED_SINCE=modified).status_code == 304
+    list_etag = c.get(teams)["ETag"]
+    with django_capture_on_commit_callbacks(execute=True):
+        other.team_name = "renamed"
+        other.save()
+    assert c.get(details, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    assert c.get(teams, HTTP_IF_NONE_MATCH=list_etag).status_code == 200
+    with django_capture_on_commit_callbacks(execute=True):
+        team.employees.clear()
+    assert c.get(details, HTTP_IF_NONE_MATCH=etag).status_code == 200
+    c.logout()
+    c.force_login(admin)  # new session and CSRF token rendered in forms
+    assert c.get(teams, HTTP_IF_NONE_MATCH=c.get(teams)["ETag"]).status_code == 304
+    response = c.get(reverse("all-reservations"))
+    etag = response["ETag"]
+    c.logout()
+    c.force_login(admin)
+    response = c.get(reverse("all-reservations"), HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    mark = ModelChangeMark.objects.get(model="timetable.team").changed_at
+    with django_capture_on_commit_callbacks(execute=True):
+        Team.objects.filter(pk=other.pk).delete()
+    assert ModelChangeMark.objects.get(model="timetable.team").changed_at > mark
+
+
+    def mark_writes(queries):
+        return [
+            q
+            for q in queries
+            if q["sql"].startswith(("UPDATE", "INSERT"))
+            and "timetable_modelchangemark" in q["sql"]
+        ]
+
+    with CaptureQueriesContext(connection) as queries:
+        with django_capture_on_commit_callbacks(execute=True):
+            reservation.comments = "Bez zmian"
+            reservation.save()
+    assert mark_writes(queries) == []  # saves carry their own updated_at
+    with CaptureQueriesContext(connection) as queries:
+        with django_capture_on_commit_callbacks(execute=True):
+            Reservation.objects.all().delete()
+    assert len(mark_writes(queries)) == 1  # one mark per model and transaction
+    ModelChangeMark.objects.filter(model="timetable.services").delete()
+    assert c.get(reverse("all-services")).status_code == 200
+    assert not ModelChangeMark.objects.filter(model="timetable.services").exists()
+
+
+@pytest.mark.django_db
+def test_reservation_export():
+    """
+    Tests JSON and NDJSON export streamed with one query and filtered like
+    reservation list.
+    """
+    admin = CustomUser.objects.create_superuser(email="admin@user.com", password="123")
+    create_teams(2)
+    create_reservations(3)
+    reservation = Reservation.objects.filter(teams__isnull=False).order_by("id").first()
+    reservation.teams.add(*Team.objects.all())
+    c = Client()
+    c.force_login(admin)
+    url = reverse("reservation-export")
+    response = c.get(url)
+    assert response.streaming
+    with CaptureQueriesContext(connection) as queries:
+        rows = json.loads(b"".join(response.streaming_content))
+    assert len(queries) == 1
+    assert len(rows) == Reservation.objects.count()
+    exported = next(row for row in rows if row["id"] == reservation.id)
+    assert sorted(exported["teams"]) == ["team0", "team1"]
+    assert exported["target_date"] == reservation.target_date.isoformat()
+    response = c.get(url, {"format": "ndjson", "status": "pending"})
+    assert response["Content-Type"] == "application/x-ndjson"
+    lines = b"".join(response.streaming_content).decode().splitlines()
+    pending = Reservation.objects.filter(is_accepted=False).count()
+    assert len(lines) == pending > 0
+    assert not any(json.loads(line)["is_accepted"] for line in lines)
+    assert c.get(url, {"format": "xml"}).status_code == 400
+    assert c.get(url, {"date_from": "jutro"}).status_code == 400
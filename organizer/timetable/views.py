@@ -1,21 +1,66 @@
+import asyncio
+import calendar
+import datetime
+from functools import update_wrapper
+
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
-from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.db import IntegrityError, transaction
+from django.http import (
+    HttpResponse,
+    HttpResponseForbidden,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse
+from django.utils.decorators import classonlymethod
 from django.views import View
-from django.views.generic import TemplateView, UpdateView, FormView
-
+from django.views.generic import TemplateView, UpdateView
+
+from timetable import workload
+from timetable.availability import availability_index
+from timetable.backends import THROTTLED, UNKNOWN_EMAIL
+from timetable.caching import (
+    ConditionalObjectMixin,
+    ConditionalResponseMixin,
+    VersionedCacheMixin,
+    cache_stats,
+)
+from timetable.calendars import month_grid
+from timetable.conflicts import batch_clashes, team_clashes
+from timetable.exports import batched, json_array, ndjson_lines, reservation_rows
 from timetable.forms import (
-    AddUserForm,
     AddEmployeeForm,
     AddTeamForm,
     AddUserReservationForm,
     LoginForm,
     SignUpForm,
     AddServiceForm,
+    ReservationFilterForm,
+    UserFilterForm,
+    EmployeeFilterForm,
+    TeamFilterForm,
+    ServiceFilterForm,
+    ScheduleForm,
+    BatchReservationForm,
+    ModifyTeamForm,
+    ManageReservationForm,
+    RecurringReservationForm,
+)
+from timetable.metrics import request_metrics
+from timetable.models import (
+    CustomUser,
+    Employee,
+    Team,
+    Services,
+    Reservation,
+    RecurringReservation,
+    date_span,
+    max_reservation_days,
 )
-from timetable.models import CustomUser, Employee, Team, Services, Reservation
+from timetable.pagination import KeysetListMixin
+from timetable.scheduling import commit_schedule, plan_schedule
 
 
 class MainPageView(View):
@@ -44,11 +89,15 @@ class AddUserView(View):
         return render(request, "create_user.html", {"form": form})
 
 
-class UserDetailsView(LoginRequiredMixin, View):
+class UserDetailsView(LoginRequiredMixin, ConditionalObjectMixin, View):
     """
     Displays user details for currently logged user.
     """
 
+    replica_reads = True
+    condition_object_model = CustomUser
+    condition_object_kwarg = "user_id"
+
     def get(self, request, user_id):
         customer = CustomUser.objects.get(pk=user_id)
         if user_id == request.user.id:
@@ -58,16 +107,27 @@ class UserDetailsView(LoginRequiredMixin, View):
             return HttpResponseForbidden()
 
 
-class AllUsersView(LoginRequiredMixin, PermissionRequiredMixin, TemplateView):
+class AllUsersView(
+    LoginRequiredMixin,
+    PermissionRequiredMixin,
+    ConditionalResponseMixin,
+    KeysetListMixin,
+    TemplateView,
+):
     """
-    Displays list of all users in database. Staff permission is needed.
+    Displays paginated list of users filtered by email prefix. Staff permission is needed.
     """
 
     permission_required = "is_staff"
+    replica_reads = True
+    condition_models = (CustomUser,)
     template_name = "all_users.html"
+    filter_form_class = UserFilterForm
+    context_object_name = "users"
+    ordering = ("email", "id")
 
-    def get_context_data(self):
-        return {"users": CustomUser.objects.filter(is_superuser=False)}
+    def get_queryset(self):
+        return CustomUser.objects.filter(is_superuser=False)
 
 
 class DeleteUserView(LoginRequiredMixin, PermissionRequiredMixin, View):
@@ -113,34 +173,63 @@ class AddUserReservationView(LoginRequiredMixin, View):
         form = AddUserReservationForm(request.POST)
         if form.is_valid():
             new_reservation = form.save(commit=False)
-            new_reservation.customer = CustomUser.objects.get(pk=request.user.id)
-            new_reservation.save()
-            return redirect(f"/reservation/{new_reservation.id}")
+            new_reservation.customer = request.user
+            if self.save_reservation(new_reservation):
+                return redirect(f"/reservation/{new_reservation.id}")
+            form.add_error(None, AddUserReservationForm.date_taken_message)
         return render(request, "make_reservation.html", {"form": form})
 
-
-class UserReservationDetailsView(LoginRequiredMixin, View):
+    def save_reservation(self, reservation):
+        """
+        Saves reservation unless its span overlaps other reservation of the service.
+        Overlap is checked with single indexed query in the inserting transaction;
+        on PostgreSQL exclusion constraint also rejects overlaps saved concurrently.
+        """
+        try:
+            with transaction.atomic():
+                overlapping = Reservation.objects.filter(
+                    service_type_id=reservation.service_type_id
+                ).overlapping(reservation.target_date, reservation.finish_date)
+                if overlapping.exists():
+                    return False
+                reservation.save()
+        except IntegrityError:
+            return False
+        return True
+
+
+class UserReservationDetailsView(LoginRequiredMixin, ConditionalObjectMixin, View):
     """
     Displays reservation details for specific reservation.
     """
 
+    replica_reads = True
+    condition_object_model = Reservation
+    condition_object_kwarg = "reservation_id"
+    condition_models = (CustomUser, Services)
+
     def get(self, request, reservation_id):
         ctx = {"reservation": Reservation.objects.get(pk=reservation_id)}
         return render(request, "reservation_details.html", ctx)
 
 
-class AllUserReservationsView(LoginRequiredMixin, View):
+class AllUserReservationsView(LoginRequiredMixin, ConditionalResponseMixin, View):
     """
     Displays all reservation for currently logged user.
     Divides reservations into pending for acceptance and one that already accepted.
     """
 
+    replica_reads = True
+    condition_models = (Reservation, CustomUser, Services)
+
     def get(self, request, user_id):
-        user = CustomUser.objects.get(pk=user_id)
-        reservations = Reservation.objects.filter(customer=user, is_accepted=False)
-        accepted_reservations = Reservation.objects.filter(
-            customer=user, is_accepted=True
+        user_reservations = (
+            Reservation.objects.filter(customer_id=user_id)
+            .select_related("customer", "service_type")
+            .order_by("target_date")
         )
+        reservations = user_reservations.filter(is_accepted=False)
+        accepted_reservations = user_reservations.filter(is_accepted=True)
         return render(
             request,
             "user_reservations_details.html",
@@ -151,6 +240,70 @@ class AllUserReservationsView(LoginRequiredMixin, View):
         )
 
 
+class AddRecurringReservationView(LoginRequiredMixin, View):
+    """
+    Creates weekly or monthly reservation for currently logged user.
+    Only the rule is saved, so it is checked again against taken dates and rules
+    read from database while service row is locked, to keep concurrent rules
+    from overlapping.
+    """
+
+    def get(self, request):
+        form = RecurringReservationForm()
+        return render(request, "make_recurring_reservation.html", {"form": form})
+
+    def post(self, request):
+        form = RecurringReservationForm(request.POST)
+        if form.is_valid():
+            service = form.cleaned_data["service_type"]
+            with transaction.atomic():
+                Services.objects.select_for_update().get(pk=service.pk)
+                if form.check_conflicts(fresh=True):
+                    rule = form.save(commit=False)
+                    rule.customer = request.user
+                    rule.save()
+                    return redirect("recurring-reservations", user_id=request.user.id)
+        return render(request, "make_recurring_reservation.html", {"form": form})
+
+
+def requested_month(request):
+    """
+    Returns first and last day of month given as `month` query parameter (YYYY-MM),
+    current month by default.
+    """
+    try:
+        start = datetime.datetime.strptime(request.GET["month"], "%Y-%m").date()
+    except (KeyError, ValueError):
+        start = datetime.date.today().replace(day=1)
+    return start, start.replace(day=calendar.monthrange(start.year, start.month)[1])
+
+
+class RecurringReservationsView(LoginRequiredMixin, View):
+    """
+    Displays recurring reservations of currently logged user with their
+    occurrences in month given as `month` query parameter (YYYY-MM), current by default.
+    """
+
+    replica_reads = True
+
+    def get(self, request, user_id):
+        if user_id != request.user.id:
+            return HttpResponseForbidden()
+        start, end = requested_month(request)
+        rules = (
+            RecurringReservation.objects.filter(customer_id=user_id)
+            .select_related("service_type")
+            .order_by("start_date", "id")
+        )
+        ctx = {
+            "month": start,
+            "previous_month": (start - datetime.timedelta(days=1)).replace(day=1),
+            "next_month": end + datetime.timedelta(days=1),
+            "rules": [(rule, list(rule.occurrences(start, end))) for rule in rules],
+        }
+        return render(request, "user_recurring_reservations.html", ctx)
+
+
 class AddEmployeeView(LoginRequiredMixin, PermissionRequiredMixin, View):
     """
     Creates new employee and saves it in database. Staff permission is needed.
@@ -175,28 +328,47 @@ class AddEmployeeView(LoginRequiredMixin, PermissionRequiredMixin, View):
         return render(request, "create_employee.html", {"form": form})
 
 
-class EmployeeDetailsView(LoginRequiredMixin, PermissionRequiredMixin, View):
+class EmployeeDetailsView(
+    LoginRequiredMixin,
+    PermissionRequiredMixin,
+    ConditionalObjectMixin,
+    VersionedCacheMixin,
+    View,
+):
     """
     Displays employee details. Staff permission is needed.
     """
 
     permission_required = "is_staff"
+    condition_object_model = Employee
+    condition_object_kwarg = "employee_id"
+    cache_models = (Employee,)
 
     def get(self, request, employee_id):
         ctx = {"employee": get_object_or_404(Employee, pk=employee_id)}
         return render(request, "employee_details.html", ctx)
 
 
-class AllEmployeesView(LoginRequiredMixin, PermissionRequiredMixin, TemplateView):
+class AllEmployeesView(
+    LoginRequiredMixin,
+    PermissionRequiredMixin,
+    ConditionalResponseMixin,
+    KeysetListMixin,
+    TemplateView,
+):
     """
-    Displays list of all employees. Staff permission is needed.
+    Displays paginated list of employees filtered by surname prefix and job.
+    Staff permission is needed.
     """
 
     permission_required = "is_staff"
+    replica_reads = True
+    condition_models = (Employee,)
     template_name = "all_employees.html"
-
-    def get_context_data(self):
-        return {"employees": Employee.objects.all()}
+    filter_form_class = EmployeeFilterForm
+    context_object_name = "employees"
+    ordering = ("employee_surname", "id")
+    model = Employee
 
 
 class DeleteEmployeeView(LoginRequiredMixin, PermissionRequiredMixin, View):
@@ -247,28 +419,61 @@ class AddTeamView(LoginRequiredMixin, PermissionRequiredMixin, View):
         return render(request, "compose_team.html", {"form": form})
 
 
-class TeamDetailsView(LoginRequiredMixin, PermissionRequiredMixin, View):
+class TeamDetailsView(
+    LoginRequiredMixin,
+    PermissionRequiredMixin,
+    ConditionalObjectMixin,
+    VersionedCacheMixin,
+    View,
+):
     """
-    Displays team details. Staff permission is needed.
+    Displays team members and upcoming accepted reservations. Staff permission is needed.
     """
 
     permission_required = "is_staff"
+    cache_models = (Team, Employee, Reservation, Services, CustomUser)
+    condition_object_model = Team
+    condition_object_kwarg = "team_id"
+    condition_models = (Employee, Reservation, Services, CustomUser)
+
+    upcoming_limit = 20
 
     def get(self, request, team_id):
-        ctx = {"team": get_object_or_404(Team, pk=team_id)}
+        team = get_object_or_404(Team.objects.with_roster(), pk=team_id)
+        upcoming_reservations = (
+            Reservation.objects.filter(
+                teams=team, is_accepted=True, finish_date__gte=datetime.date.today()
+            )
+            .select_related("customer", "service_type")
+            .order_by("target_date", "id")[: self.upcoming_limit]
+        )
+        ctx = {"team": team, "upcoming_reservations": upcoming_reservations}
         return render(request, "team_details.html", ctx)
 
 
-class AllTeamsView(LoginRequiredMixin, PermissionRequiredMixin, TemplateView):
+class AllTeamsView(
+    LoginRequiredMixin,
+    PermissionRequiredMixin,
+    ConditionalResponseMixin,
+    VersionedCacheMixin,
+    KeysetListMixin,
+    TemplateView,
+):
     """
-    Displays list of all teams. Staff permission is needed.
+    Displays paginated roster of teams filtered by name prefix, with members,
+    member count and number of upcoming reservations. Staff permission is needed.
     """
 
     permission_required = "is_staff"
     template_name = "all_teams.html"
+    filter_form_class = TeamFilterForm
+    cache_models = (Team, Employee, Reservation)
+    condition_models = cache_models
+    context_object_name = "teams"
+    ordering = ("team_name", "id")
 
-    def get_context_data(self):
-        return {"teams": Team.objects.all()}
+    def get_queryset(self):
+        return Team.objects.with_roster()
 
 
 class DeleteTeamView(LoginRequiredMixin, PermissionRequiredMixin, View):
@@ -292,7 +497,7 @@ class ModifyTeamView(LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
 
     permission_required = "is_staff"
     model = Team
-    fields = ["team_name", "employees"]
+    form_class = ModifyTeamForm
     template_name = "modify_team.html"
 
 
@@ -311,7 +516,10 @@ class AddServiceView(LoginRequiredMixin, PermissionRequiredMixin, View):
         form = AddServiceForm(request.POST)
         if form.is_valid():
             service_name = form.cleaned_data["service_name"]
-            Services.objects.create(service_name=service_name)
+            min_team_size = form.cleaned_data["min_team_size"]
+            Services.objects.create(
+                service_name=service_name, min_team_size=min_team_size
+            )
             return redirect("/all-services/")
         return render(request, "create_service.html", {"form": form})
 
@@ -330,31 +538,164 @@ class DeleteServiceView(LoginRequiredMixin, PermissionRequiredMixin, View):
         return render(request, "message.html", {"message": message})
 
 
-class AllServicesView(LoginRequiredMixin, PermissionRequiredMixin, TemplateView):
+class AllServicesView(
+    LoginRequiredMixin,
+    PermissionRequiredMixin,
+    ConditionalResponseMixin,
+    VersionedCacheMixin,
+    KeysetListMixin,
+    TemplateView,
+):
     """
-    Displays list of all services. Staff permission is needed.
+    Displays paginated list of services filtered by name prefix. Staff permission is needed.
     """
 
     permission_required = "is_staff"
     template_name = "all_services.html"
-
-    def get_context_data(self):
-        return {"services": Services.objects.all()}
+    filter_form_class = ServiceFilterForm
+    cache_models = (Services,)
+    condition_models = cache_models
+    context_object_name = "services"
+    ordering = ("service_name", "id")
+    model = Services
 
 
-class AllReservationsView(LoginRequiredMixin, PermissionRequiredMixin, TemplateView):
+class AllReservationsView(
+    LoginRequiredMixin,
+    PermissionRequiredMixin,
+    ConditionalResponseMixin,
+    KeysetListMixin,
+    TemplateView,
+):
     """
-    Displays list of all reservations. Staff permission is needed.
+    Displays paginated list of reservations filtered by date, service and status.
+    Pages are fetched by cursor over (target_date, id) with customer and service joined,
+    so every page costs the same number of queries. Staff permission is needed.
     """
 
     permission_required = "is_staff"
+    replica_reads = True
+    condition_models = (Reservation, CustomUser, Services, Team)
     template_name = "all_reservations.html"
+    filter_form_class = ReservationFilterForm
+    context_object_name = "reservations"
+    ordering = ("target_date", "id")
+    paginate_by = 50
+
+    def get_queryset(self):
+        return Reservation.objects.select_related("customer", "service_type")
 
     def get_context_data(self):
-        return {
-            "reservations": Reservation.objects.filter(is_accepted=False),
-            "accepted_reservations": Reservation.objects.filter(is_accepted=True),
+        ctx = super().get_context_data()
+        ctx["batch_form"] = BatchReservationForm()
+        query = self.request.GET.copy()
+        query.pop("cursor", None)
+        ctx["export_query"] = query.urlencode()
+        return ctx
+
+
+class ReservationExportView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    """
+    Streams reservations filtered like reservation list as JSON array, or as one JSON
+    object per line with `format=ndjson`. Rows are read through server-side cursor
+    while response is written, so worker memory doesn't grow with number of rows.
+    Staff permission is needed.
+    """
+
+    permission_required = "is_staff"
+    replica_reads = True
+    formats = {
+        "json": (json_array, "application/json"),
+        "ndjson": (ndjson_lines, "application/x-ndjson"),
+    }
+
+    def get(self, request):
+        export_format = request.GET.get("format") or "json"
+        if export_format not in self.formats:
+            return JsonResponse({"error": "Nieznany format eksportu"}, status=400)
+        form = ReservationFilterForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({"error": form.errors.get_json_data()}, status=400)
+        queryset = form.filter(Reservation.objects.all())
+        # Rows are read after middleware finished the request, so database chosen
+        # by router for this request has to be fixed now.
+        queryset = queryset.using(queryset.db)
+        serialize, content_type = self.formats[export_format]
+        response = StreamingHttpResponse(
+            batched(serialize(reservation_rows(queryset))), content_type=content_type
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="reservations.{export_format}"'
+        )
+        return response
+
+
+class ReservationCalendarView(
+    LoginRequiredMixin, PermissionRequiredMixin, ConditionalResponseMixin, View
+):
+    """
+    Displays calendar grid of all reservations in month given as `month` query parameter
+    (YYYY-MM), current by default. Month is read with single query and grouped by day
+    in memory. Unchanged month is answered with 304 Not Modified. Staff permission is needed.
+    """
+
+    permission_required = "is_staff"
+    condition_models = (Reservation, CustomUser, Services, Team)
+
+    def get(self, request):
+        start, end = requested_month(request)
+        ctx = {
+            "month": start,
+            "previous_month": (start - datetime.timedelta(days=1)).replace(day=1),
+            "next_month": end + datetime.timedelta(days=1),
+            "weekdays": ["Pn", "Wt", "Śr", "Cz", "Pt", "So", "Nd"],
+            "weeks": month_grid(start, end),
         }
+        return render(request, "reservation_calendar.html", ctx)
+
+
+class BatchReservationView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    """
+    Accepts, rejects or assigns teams to selected pending reservations in one transaction.
+    Uses single UPDATE and bulk inserts into teams table instead of saving reservations one by one.
+    Rejected reservations are deleted and teams already working on any day of selected
+    reservations are refused. Staff permission is needed.
+    """
+
+    permission_required = "is_staff"
+
+    def post(self, request):
+        form = BatchReservationForm(request.POST)
+        if not form.is_valid():
+            message = "Nie wybrano rezerwacji lub akcji"
+            return render(request, "message.html", {"message": message}, status=400)
+        reservations = Reservation.objects.filter(
+            pk__in=form.cleaned_data["reservations"].values("pk")
+        )
+        action = form.cleaned_data["action"]
+        with transaction.atomic():
+            if action != "reject":
+                teams = {team.pk: team for team in form.cleaned_data["teams"]}
+                clashes = batch_clashes(reservations, teams)
+                if clashes:
+                    team_id, date = clashes[0]
+                    message = f"Ekipa {teams[team_id]} ma już zlecenie w dniu {date}"
+                    return render(
+                        request, "message.html", {"message": message}, status=409
+                    )
+            if action == "reject":
+                count = reservations.delete()[1].get(Reservation._meta.label, 0)
+                message = f"Odrzucono {count} rezerwacji"
+            else:
+                reservations.assign_teams(form.cleaned_data["teams"])
+                message = "Przydzielono ekipy"
+            if action == "accept":
+                # Selection is limited to pending reservations, so it's read before accepting.
+                reservation_ids = list(reservations.values_list("pk", flat=True))
+                count = reservations.accept()
+                workload.refresh_reservations(reservation_ids)
+                message = f"Zaakceptowano {count} rezerwacji"
+        return render(request, "message.html", {"message": message})
 
 
 class ManageReservationView(LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
@@ -364,37 +705,245 @@ class ManageReservationView(LoginRequiredMixin, PermissionRequiredMixin, UpdateV
 
     permission_required = "is_staff"
     model = Reservation
-    fields = [
-        "customer",
-        "teams",
-        "target_date",
-        "comments",
-        "is_accepted",
-        "service_type",
-    ]
+    form_class = ManageReservationForm
     template_name = "manage_reservation.html"
 
 
-class CheckReservationView(View):
+class ScheduleReservationsView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    """
+    Assigns teams to all pending reservations in selected date range at once.
+    GET shows preview of planned assignments, POST plans them again and saves. Staff permission is needed.
+    """
+
+    permission_required = "is_staff"
+
+    def get(self, request):
+        ctx = {"form": ScheduleForm()}
+        if request.GET:
+            form = ScheduleForm(request.GET)
+            ctx["form"] = form
+            if form.is_valid():
+                ctx["plan"] = plan_schedule(
+                    form.cleaned_data["date_from"], form.cleaned_data["date_to"]
+                )
+        return render(request, "schedule_reservations.html", ctx)
+
+    def post(self, request):
+        form = ScheduleForm(request.POST)
+        if form.is_valid():
+            plan = commit_schedule(
+                form.cleaned_data["date_from"],
+                form.cleaned_data["date_to"],
+                accept=form.cleaned_data["accept"],
+            )
+            message = f"Przydzielono ekipy do {len(plan)} rezerwacji"
+            return render(request, "message.html", {"message": message})
+        return render(request, "schedule_reservations.html", {"form": form})
+
+
+class AsyncView(View):
+    """
+    Base view for async method handlers.
+    Class-based views of Django 4.0 are called synchronously, so view function
+    is wrapped in coroutine function which ASGI handler awaits on event loop.
+    """
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+            return response
+
+        return update_wrapper(async_view, view)
+
+
+class CheckReservationView(AsyncView):
     """
     Provides date boolean JsonResponse for selected service type.
     Main functionality is to check if there is free date for current service.
+    Optional `finish` query parameter checks every day of multi-day reservation.
+    """
+
+    async def get(self, request, date, service):
+        try:
+            is_available = await availability_index.ais_available(
+                service, date, self.get_finish(request, date)
+            )
+        except ValueError as error:
+            return JsonResponse({"error": str(error)}, status=400)
+        return JsonResponse({"is_available": is_available})
+
+    def get_finish(self, request, date):
+        finish = request.GET.get("finish")
+        if not finish:
+            return None
+        finish = datetime.date.fromisoformat(finish)
+        days = (finish - datetime.date.fromisoformat(date)).days
+        if not 0 <= days < max_reservation_days():
+            raise ValueError(
+                f"reservation must last from 1 to {max_reservation_days()} days"
+            )
+        return finish
+
+
+class DateRangeMixin:
     """
+    Reads date range from `start` and `end` query parameters (YYYY-MM-DD),
+    defaulting to current month.
+    """
+
+    max_range_days = 366
 
-    def get(self, request, date, service):
-        service_obj = Services.objects.get(pk=service)
-        reservation = Reservation.objects.filter(
-            target_date=date, service_type=service_obj
+    def get_date_range(self, request):
+        today = datetime.date.today()
+        start = request.GET.get("start")
+        end = request.GET.get("end")
+        start = (
+            datetime.date.fromisoformat(start) if start else today.replace(day=1)
         )
-        if reservation:
-            return JsonResponse({"is_available": False})
+        if end:
+            end = datetime.date.fromisoformat(end)
         else:
-            return JsonResponse({"is_available": True})
+            last_day = calendar.monthrange(start.year, start.month)[1]
+            end = start.replace(day=last_day)
+        if end < start:
+            raise ValueError("end date is earlier than start date")
+        if (end - start).days >= self.max_range_days:
+            raise ValueError(f"date range is limited to {self.max_range_days} days")
+        return start, end
+
+
+class ServiceAvailabilityView(DateRangeMixin, AsyncView):
+    """
+    Provides JsonResponse with all occupied dates of selected service in given date range.
+    Range is passed as `start` and `end` query parameters (YYYY-MM-DD) and defaults to current month.
+    Lets reservation form validate dates client-side instead of asking about every single date.
+    """
+
+    async def get(self, request, service):
+        try:
+            start, end = self.get_date_range(request)
+        except ValueError as error:
+            return JsonResponse({"error": str(error)}, status=400)
+        occupied = await availability_index.aoccupied_between(service, start, end)
+        return JsonResponse(
+            {
+                "service": service,
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "occupied": [date.isoformat() for date in occupied],
+            }
+        )
+
+
+class TeamAvailabilityView(
+    LoginRequiredMixin, PermissionRequiredMixin, DateRangeMixin, View
+):
+    """
+    Provides JsonResponse with dates on which team works in given date range,
+    read with single query over reservations overlapping the range.
+    Staff permission is needed.
+    """
+
+    permission_required = "is_staff"
+
+    def get(self, request, team_id):
+        try:
+            start, end = self.get_date_range(request)
+        except ValueError as error:
+            return JsonResponse({"error": str(error)}, status=400)
+        spans = (
+            Reservation.objects.filter(teams=team_id)
+            .overlapping(start, end)
+            .values_list("target_date", "finish_date")
+        )
+        occupied = {
+            date
+            for target_date, finish_date in spans
+            for date in date_span(max(target_date, start), min(finish_date, end))
+        }
+        return JsonResponse(
+            {
+                "team": team_id,
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "occupied": [date.isoformat() for date in sorted(occupied)],
+            }
+        )
+
+
+class TeamClashesView(LoginRequiredMixin, PermissionRequiredMixin, DateRangeMixin, View):
+    """
+    Lists every pair of reservations sharing a team on overlapping days in date range
+    given with `start` and `end` query parameters, current month by default.
+    Staff permission is needed.
+    """
+
+    permission_required = "is_staff"
+
+    def get(self, request):
+        try:
+            start, end = self.get_date_range(request)
+        except ValueError as error:
+            return render(request, "message.html", {"message": str(error)}, status=400)
+        ctx = {"start": start, "end": end, "clashes": team_clashes(start, end)}
+        return render(request, "team_clashes.html", ctx)
+
+
+class WorkloadReportView(LoginRequiredMixin, PermissionRequiredMixin, DateRangeMixin, View):
+    """
+    Displays number of jobs of every employee per week in date range given with
+    `start` and `end` query parameters, current month by default.
+    Reads precomputed weekly workload instead of joining reservations with teams.
+    Staff permission is needed.
+    """
+
+    permission_required = "is_staff"
+
+    def get(self, request):
+        try:
+            start, end = self.get_date_range(request)
+        except ValueError as error:
+            return render(request, "message.html", {"message": str(error)}, status=400)
+        weeks, rows = workload.weekly_report(start, end)
+        ctx = {"start": start, "end": end, "weeks": weeks, "rows": rows}
+        return render(request, "workload.html", ctx)
+
+
+class CacheStatsView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    """
+    Provides JsonResponse with response cache hits and misses of every cached view
+    counted by current worker process. Staff permission is needed.
+    """
+
+    permission_required = "is_staff"
+
+    def get(self, request):
+        return JsonResponse(cache_stats.as_dict())
+
+
+class MetricsView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    """
+    Provides request metrics of current worker process in Prometheus text format.
+    Staff permission is needed.
+    """
+
+    permission_required = "is_staff"
+
+    def get(self, request):
+        return HttpResponse(
+            request_metrics.exposition(), content_type="text/plain; version=0.0.4"
+        )
 
 
 class LoginView(View):
     """
-    Displays login panel.
+    Displays login panel. User is resolved once by timetable.backends.EmailBackend,
+    which also tells if email is unknown or client is throttled.
     """
 
     def get(self, request):
@@ -408,17 +957,21 @@ class LoginView(View):
             username = form.cleaned_data["username"]
             password = form.cleaned_data["password"]
 
-            user = authenticate(email=username, password=password)
+            user = authenticate(request, email=username, password=password)
             if user is not None:
                 login(request, user)
                 return redirect(reverse("index"))
-            user = CustomUser.objects.filter(email=username)
-            if user:
+            failure = getattr(request, "login_failure", None)
+            if failure == UNKNOWN_EMAIL:
+                return redirect("/add-user/")
+            if failure == THROTTLED:
+                message = "Zbyt wiele nieudanych prób logowania, spróbuj ponownie później"
+                status = 429
+            else:
                 message = "Nieprawidłowy login lub hasło"
-                form = LoginForm()
-                ctx = {"form": form, "message": message}
-                return render(request, "login_form.html", ctx)
-            return redirect("/add-user/")
+                status = 200
+            ctx = {"form": LoginForm(), "message": message}
+            return render(request, "login_form.html", ctx, status=status)
 
         else:
             ctx = {"form": form}
@@ -0,0 +1,160 @@
+import datetime
+
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncWeek
+
+from timetable.models import Employee, EmployeeWorkload, Reservation, Team
+
+ReservationTeam = Reservation.teams.through
+TeamMember = Team.employees.through
+BATCH_SIZE = 1000
+
+
+def week_start(date):
+    return date - datetime.timedelta(days=date.weekday())
+
+
+def count_jobs(**filters):
+    """
+    Returns (employee id, week start, jobs) of accepted reservations matching filters
+    with single aggregate query. Employee in several teams of one reservation
+    works on it once.
+    """
+    # Filters go to the same filter() call, so they share teams and employees joins
+    # grouped by below.
+    return (
+        Reservation.objects.filter(
+            is_accepted=True, teams__employees__isnull=False, **filters
+        )
+        .annotate(week=TruncWeek("target_date"))
+        .order_by()
+        .values_list("teams__employees", "week")
+        .annotate(jobs=Count("id", distinct=True))
+    )
+
+
+def refresh(employee_ids, dates):
+    """
+    Recomputes workload of given employees in weeks of given dates.
+    Employees are locked first, so refreshes committed at the same time for one
+    employee run one after another and the second one counts jobs committed
+    by the first instead of inserting the same rows again.
+    """
+    employee_ids = sorted(set(employee_ids) - {None})
+    weeks = {week_start(date) for date in dates if date is not None}
+    if not employee_ids or not weeks:
+        return
+    with transaction.atomic():
+        list(
+            Employee.objects.select_for_update()
+            .filter(pk__in=employee_ids)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        EmployeeWorkload.objects.filter(
+            employee_id__in=employee_ids, week_start__in=weeks
+        ).delete()
+        # Range on target_date keeps the index scan, week filter drops days of weeks
+        # between given ones.
+        rows = count_jobs(
+            teams__employees__in=employee_ids,
+            target_date__gte=min(weeks),
+            target_date__lt=max(weeks) + datetime.timedelta(days=7),
+        ).filter(week__in=weeks)
+        EmployeeWorkload.objects.bulk_create(
+            [
+                EmployeeWorkload(employee_id=employee_id, week_start=week, jobs=jobs)
+                for employee_id, week, jobs in rows
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+
+def team_members(team_ids):
+    return set(
+        TeamMember.objects.filter(team_id__in=team_ids).values_list(
+            "employee_id", flat=True
+        )
+    )
+
+
+def team_dates(team_ids):
+    return set(
+        ReservationTeam.objects.filter(
+            team_id__in=team_ids, reservation__is_accepted=True
+        ).values_list("reservation__target_date", flat=True)
+    )
+
+
+def reservation_members(reservation_ids):
+    return set(
+        TeamMember.objects.filter(team__reservation__in=reservation_ids).values_list(
+            "employee_id", flat=True
+        )
+    )
+
+
+def reservation_dates(reservation_ids):
+    return set(
+        Reservation.objects.filter(pk__in=reservation_ids).values_list(
+            "target_date", flat=True
+        )
+    )
+
+
+def refresh_teams(team_ids, dates):
+    """
+    Recomputes workload of members of given teams in weeks of given dates.
+    """
+    refresh(team_members(team_ids), dates)
+
+
+def refresh_reservations(reservation_ids):
+    """
+    Recomputes workload of members of teams of given reservations in their weeks.
+    """
+    refresh(reservation_members(reservation_ids), reservation_dates(reservation_ids))
+
+
+def rebuild():
+    """
+    Recomputes whole workload table from reservations.
+    """
+    with transaction.atomic():
+        EmployeeWorkload.objects.all().delete()
+        EmployeeWorkload.objects.bulk_create(
+            (
+                EmployeeWorkload(employee_id=employee_id, week_start=week, jobs=jobs)
+                for employee_id, week, jobs in count_jobs()
+            ),
+            batch_size=BATCH_SIZE,
+        )
+    return EmployeeWorkload.objects.count()
+
+
+def weekly_report(start, end):
+    """
+    Returns weeks starting between start and end and rows of (employee, jobs per week)
+    of employees working in any of them, read from workload table with one query.
+    """
+    first = week_start(start)
+    weeks = []
+    week = first
+    while week <= end:
+        weeks.append(week)
+        week += datetime.timedelta(days=7)
+    jobs = {}
+    employees = {}
+    for workload in EmployeeWorkload.objects.filter(
+        week_start__range=(first, end), jobs__gt=0
+    ).select_related("employee"):
+        employees[workload.employee_id] = workload.employee
+        jobs[(workload.employee_id, workload.week_start)] = workload.jobs
+    rows = [
+        (employee, [jobs.get((employee.pk, week), 0) for week in weeks])
+        for employee in sorted(
+            employees.values(), key=lambda e: (e.employee_surname, e.pk)
+        )
+    ]
+    return weeks, rows